@@ -0,0 +1,48 @@
+"""
+Lecture des PDFs contenus dans des archives tar (compressées ou non) et zip.
+
+Les archives sont lues en flux, membre après membre : un seul PDF est décompressé à
+la fois, directement en mémoire, sans jamais écrire le contenu de l'archive sur le
+disque. Les archives tar sont ouvertes en mode flux (`r|*`), sans retour en arrière :
+un `.tar.gz` de plusieurs gigaoctets n'est lu qu'une fois, du début à la fin.
+"""
+
+import lzma
+import posixpath
+import tarfile
+import zipfile
+import zlib
+
+from manifest import is_pdf
+
+# Erreurs d'une archive illisible, tronquée ou corrompue (gzip.BadGzipFile est un
+# OSError)
+ARCHIVE_ERRORS = (tarfile.TarError, zipfile.BadZipFile, EOFError, zlib.error, lzma.LZMAError, OSError)
+
+
+def member_name(name):
+    # Chemin du membre dans l'archive, ou None s'il sortirait du dossier des sorties
+    # (chemin absolu, « .. ») ou n'est pas un PDF
+    name = posixpath.normpath(name.replace("\\", "/"))
+    if name.startswith("/") or name == ".." or name.startswith("../") or not is_pdf(posixpath.basename(name)):
+        return None
+    return name
+
+
+def iter_archive_pdfs(path):
+    # Rend (chemin du PDF dans l'archive, contenu) pour chaque PDF de l'archive, dans
+    # l'ordre de l'archive
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                name = None if info.is_dir() else member_name(info.filename)
+                if name is not None:
+                    with archive.open(info) as f:
+                        yield name, f.read()
+        return
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            name = member_name(member.name) if member.isfile() else None
+            if name is not None:
+                # Le membre doit être lu avant de passer au suivant
+                yield name, archive.extractfile(member).read()
@@ -0,0 +1,62 @@
+"""
+Découpage des très gros PDFs en morceaux de quelques dizaines de pages.
+
+Les morceaux sont extraits en parallèle puis leurs TEI sont réassemblés
+(tei_utils.stitch_tei). La bibliographie est repérée avant le découpage pour ne
+jamais tomber à cheval sur deux morceaux.
+"""
+
+import os
+import re
+
+from PyPDF2 import PdfReader, PdfWriter
+
+BIBLIOGRAPHY_HEADING = re.compile(
+    r"^\s*(?:\d+\.?\s*)?(references|bibliography|works cited|literature cited|références|bibliographie)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Part de la fin du document où la bibliographie est cherchée
+BIBLIOGRAPHY_SEARCH_FRACTION = 0.5
+
+
+def find_bibliography_page(reader):
+    # Recherche depuis la fin : le dernier titre « References » est celui de la
+    # bibliographie (et non une mention dans la table des matières)
+    page_count = len(reader.pages)
+    first_page = int(page_count * (1 - BIBLIOGRAPHY_SEARCH_FRACTION))
+    for index in range(page_count - 1, first_page - 1, -1):
+        try:
+            text = reader.pages[index].extract_text()
+        except Exception:
+            continue
+        if BIBLIOGRAPHY_HEADING.search(text or ""):
+            return index
+    return None
+
+
+def plan_chunks(page_count, chunk_pages, bibliography_page=None):
+    # Bornes de découpage toutes les `chunk_pages` pages, sauf à l'intérieur de la
+    # bibliographie, qui reste dans le dernier morceau
+    boundaries = list(range(0, page_count, chunk_pages))
+    if bibliography_page is not None:
+        boundaries = [start for start in boundaries if start <= bibliography_page]
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:] + [page_count])]
+
+
+def split_pdf(pdf_path, chunk_pages, chunk_dir):
+    # Écrit les morceaux dans chunk_dir et retourne leurs noms, dans l'ordre
+    os.makedirs(chunk_dir, exist_ok=True)
+    reader = PdfReader(pdf_path)
+    chunks = plan_chunks(len(reader.pages), chunk_pages, find_bibliography_page(reader))
+
+    chunk_names = []
+    for index, (start, end) in enumerate(chunks):
+        writer = PdfWriter()
+        for page in reader.pages[start:end]:
+            writer.add_page(page)
+        chunk_name = f"part-{index:03d}.pdf"
+        with open(os.path.join(chunk_dir, chunk_name), "wb") as f:
+            writer.write(f)
+        chunk_names.append(chunk_name)
+    return chunk_names
@@ -0,0 +1,62 @@
+"""
+Vérification de la cohérence entre les citations du texte et la bibliographie.
+
+À partir du TEI complet produit par GROBID :
+- les citations du texte (ref type="bibr") qui ne renvoient à aucune entrée de la
+  bibliographie ;
+- les entrées de la bibliographie (biblStruct) jamais citées dans le texte.
+"""
+
+import json
+import os
+
+from compression import open_output
+from tei_utils import NS, XML_NS, parse_tei
+
+
+def bibl_title(bibl_struct):
+    for path in ("tei:analytic/tei:title", "tei:monogr/tei:title"):
+        title = bibl_struct.find(path, NS)
+        if title is not None and title.text:
+            return " ".join(title.text.split())
+    return None
+
+
+def check_coherence(fulltext_tei):
+    root = parse_tei(fulltext_tei)
+
+    bibliography = {}
+    for bibl_struct in root.iterfind(".//tei:text/tei:back//tei:listBibl/tei:biblStruct", NS):
+        bibliography[bibl_struct.get(f"{{{XML_NS}}}id")] = bibl_title(bibl_struct)
+
+    citations = 0
+    cited = set()
+    missing = []
+    for ref in root.iterfind(".//tei:text/tei:body//tei:ref[@type='bibr']", NS):
+        citations += 1
+        target = (ref.get("target") or "").lstrip("#")
+        if target in bibliography:
+            cited.add(target)
+        else:
+            missing.append(" ".join("".join(ref.itertext()).split()))
+
+    return {
+        "references": len(bibliography),
+        "citations": citations,
+        "missing_in_bibliography": missing,
+        "uncited_references": [
+            {"id": bibl_id, "title": title} for bibl_id, title in bibliography.items() if bibl_id not in cited
+        ],
+    }
+
+
+def report_file_name(fulltext_name):
+    return fulltext_name[: -len(".tei.xml")] + ".coherence.json"
+
+
+def write_coherence_report(output_path, fulltext_name):
+    with open_output(output_path, fulltext_name) as f:
+        report = check_coherence(f)
+    with open(os.path.join(output_path, report_file_name(fulltext_name)), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, ensure_ascii=False)
+    return report
@@ -0,0 +1,87 @@
+"""
+Compression des sorties TEI.
+
+Les TEI sont du XML très redondant : compressés en `.tei.xml.gz` (gzip, bibliothèque
+standard) ou `.tei.xml.zst` (zstandard, optionnel), ils occupent 5 à 10 fois moins de
+place. Les lecteurs passent par `open_output`, qui trouve la variante présente sur le
+disque et la décompresse au fil de la lecture, sans charger le fichier compressé en
+mémoire.
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+
+COMPRESSION_SUFFIXES = {"gz": ".gz", "zst": ".zst"}
+
+
+def zstandard_available():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compressed_name(name, compression):
+    return name + COMPRESSION_SUFFIXES[compression] if compression else name
+
+
+def open_compressed(path, mode="rb"):
+    # Ouvre `path` en mode binaire, en (dé)compressant selon son extension
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        import zstandard
+
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def output_variants(path):
+    # Variantes compressées d'abord : elles sont écrites de façon atomique, alors que
+    # le fichier brut peut disparaître pendant sa compression
+    return [path + suffix for suffix in COMPRESSION_SUFFIXES.values()] + [path]
+
+
+def open_output(output_path, name):
+    # Flux binaire décompressé de la sortie `name`, quelle que soit sa variante.
+    # Deux passages : si `compress_output` termine pendant le premier (variante
+    # compressée cherchée avant son renommage, fichier brut supprimé juste après),
+    # le second trouve la variante compressée
+    for _ in range(2):
+        for path in output_variants(os.path.join(output_path, name)):
+            try:
+                return open_compressed(path)
+            except FileNotFoundError:
+                continue
+    raise FileNotFoundError(os.path.join(output_path, name))
+
+
+def remove_variants(path, keep=None):
+    for variant in output_variants(path):
+        if variant != keep:
+            try:
+                os.remove(variant)
+            except FileNotFoundError:
+                pass
+
+
+def compress_output(path, compression):
+    # Remplace le fichier brut `path` par sa version compressée, ou retire les
+    # anciennes versions compressées si `compression` est None
+    target = compressed_name(path, compression)
+    if compression:
+        # Le suffixe du fichier temporaire choisit le compresseur
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp" + COMPRESSION_SUFFIXES[compression])
+        os.close(fd)
+        try:
+            with open(path, "rb") as source, open_compressed(tmp_path, "wb") as f:
+                shutil.copyfileobj(source, f)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    remove_variants(path, keep=target)
+    return target
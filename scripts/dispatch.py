@@ -0,0 +1,106 @@
+"""
+Envoi concurrent des documents vers le backend d'extraction.
+
+Un nombre fixe de tâches asyncio puise dans une file de documents : au plus
+`concurrency` documents sont en cours de traitement à un instant donné et les
+résultats sont rendus dans l'ordre des entrées. Le délai maximal d'un document est
+appliqué par le backend lui-même (délai de la socket HTTP) : un appel bloqué ne peut
+pas être interrompu depuis Python, son thread resterait occupé. Le dispatcher attend
+donc la fin de chaque appel et ne compte la durée d'un document qu'à partir du
+moment où il est réellement envoyé : un document en attente derrière un document
+bloqué n'est jamais compté comme ayant dépassé son délai.
+Un document en échec est retenté avec un délai croissant ; si le disjoncteur
+s'ouvre, les documents restants ne sont plus envoyés. Avec un budget mémoire, un
+document n'est envoyé que si la mémoire estimée des documents en cours, la sienne
+comprise, tient dans le budget (un document plus gros que le budget passe seul).
+"""
+
+import asyncio
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resilience import CircuitOpenError, backoff_delay
+
+DispatchResult = collections.namedtuple("DispatchResult", ["item", "result", "error", "elapsed", "attempts"])
+
+
+async def dispatch_documents(items, worker, concurrency=4, timeout=300, retries=0, backoff=2.0, breaker=None,
+                             memory=None, memory_budget=None):
+    # `memory(item)` : mémoire estimée du document, comparée à `memory_budget` ;
+    # `timeout` : délai appliqué par `worker`, pour le message des documents en retard
+    items = list(items)
+    results = [None] * len(items)
+    queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+    in_use = 0
+    admission = asyncio.Condition()
+
+    async def admit(item):
+        nonlocal in_use
+        async with admission:
+            await admission.wait_for(lambda: in_use == 0 or in_use + memory(item) <= memory_budget)
+            in_use += memory(item)
+
+    async def release(item):
+        nonlocal in_use
+        async with admission:
+            in_use -= memory(item)
+            admission.notify_all()
+
+    def timed_call(item):
+        # Exécuté dans le thread : la durée n'est mesurée qu'à partir du début
+        # effectif de l'appel
+        start = time.monotonic()
+        try:
+            return worker(item), None, time.monotonic() - start
+        except Exception as e:
+            return None, e, time.monotonic() - start
+
+    loop = asyncio.get_running_loop()
+    # Un thread par emplacement : les appels bloquants (HTTP, disque) ne dépassent
+    # jamais la fenêtre de concurrence
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        async def run_worker():
+            while True:
+                try:
+                    index, item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                for attempt in range(retries + 1):
+                    if breaker is not None and breaker.open:
+                        results[index] = DispatchResult(item, None, CircuitOpenError("disjoncteur ouvert"), 0.0, attempt)
+                        break
+                    if memory is not None:
+                        await admit(item)
+                    result, error, elapsed = await loop.run_in_executor(executor, timed_call, item)
+                    # La mémoire n'est rendue qu'une fois l'appel réellement terminé
+                    # (`timed_call` ne lève pas) : une reprise n'est jamais admise
+                    # tant que GROBID traite encore le document
+                    if memory is not None:
+                        await release(item)
+                    if error is None:
+                        results[index] = DispatchResult(item, result, None, elapsed, attempt + 1)
+                        if breaker is not None:
+                            breaker.record(True)
+                        break
+                    if isinstance(error, TimeoutError) and timeout is not None:
+                        error = TimeoutError(f"délai de {timeout} secondes dépassé")
+                    results[index] = DispatchResult(item, None, error, elapsed, attempt + 1)
+                    if breaker is not None:
+                        breaker.record(False)
+                    if attempt < retries:
+                        await asyncio.sleep(backoff_delay(attempt, backoff))
+
+        await asyncio.gather(*(run_worker() for _ in range(min(concurrency, len(items)) or 1)))
+
+    return results
+
+
+def dispatch(items, worker, concurrency=4, timeout=300, retries=0, backoff=2.0, breaker=None, memory=None,
+             memory_budget=None):
+    # Point d'entrée synchrone pour le script
+    return asyncio.run(dispatch_documents(items, worker, concurrency, timeout, retries, backoff, breaker, memory,
+                                          memory_budget))
@@ -0,0 +1,81 @@
+"""
+GROBID exécuté dans le processus Python, par pyjnius.
+
+Le jar « onejar » de GROBID est chargé dans une JVM hébergée par le processus : les
+modèles ne sont initialisés qu'une fois, puis chaque PDF est un simple appel de
+méthode, sans lancement de processus ni démarrage de JVM. `jnius` n'est importé
+qu'à la création du moteur : le reste du script fonctionne sans lui.
+
+Une seule JVM peut exister par processus et ses options (classpath, -Xmx) sont fixées
+à sa création : le moteur est donc partagé (`get_embedded_grobid`). Les appels sont
+sérialisés, le moteur GROBID n'étant pas prévu pour être appelé depuis plusieurs
+threads à la fois. Un appel en cours ne peut pas être interrompu (GROBID n'offre pas
+d'annulation) : aucun délai maximal ne s'applique aux documents.
+"""
+
+import os
+import tempfile
+import threading
+
+from tei_utils import derive_references_tei
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class EmbeddedGrobidError(RuntimeError):
+    # Moteur embarqué impossible à créer : pyjnius absent, JVM déjà démarrée avec
+    # d'autres options, ou GROBID mal configuré (grobid-home, bibliothèques natives)
+    pass
+
+
+class EmbeddedGrobid:
+    def __init__(self, jar_path, grobid_home, heap_mb=2048):
+        if not os.path.exists(jar_path):
+            raise FileNotFoundError(jar_path)
+        try:
+            import jnius_config
+
+            # ValueError si une JVM existe déjà dans le processus
+            jnius_config.add_options(f"-Xmx{heap_mb}m")
+            jnius_config.set_classpath(os.path.abspath(jar_path))
+            from jnius import JavaException, autoclass
+        except (ImportError, ValueError) as e:
+            raise EmbeddedGrobidError(str(e)) from e
+
+        # Configuration de GROBID à partir de grobid-home, puis chargement des
+        # bibliothèques natives et des modèles
+        try:
+            home_paths = autoclass("java.util.ArrayList")()
+            home_paths.add(os.path.abspath(grobid_home))
+            home_finder = autoclass("org.grobid.core.main.GrobidHomeFinder")(home_paths)
+            autoclass("org.grobid.core.utilities.GrobidProperties").getInstance(home_finder)
+            autoclass("org.grobid.core.main.LibraryLoader").load()
+            self.engine = autoclass("org.grobid.core.factory.GrobidFactory").getInstance().createEngine()
+            self.config = autoclass("org.grobid.core.engines.config.GrobidAnalysisConfig").defaultInstance()
+        except JavaException as e:
+            raise EmbeddedGrobidError(str(e)) from e
+        self.File = autoclass("java.io.File")
+        self.lock = threading.Lock()
+
+    def process_fulltext(self, pdf_bytes):
+        # GROBID lit les PDFs depuis un fichier : le contenu passe par un fichier
+        # temporaire, supprimé après l'appel
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            pdf_file.write(pdf_bytes)
+            pdf_file.flush()
+            with self.lock:
+                return self.engine.fullTextToTEI(self.File(pdf_file.name), self.config)
+
+    def process_references(self, pdf_bytes):
+        # Même TEI des références que dans le reste du script : découpé dans le TEI
+        # complet
+        return derive_references_tei(self.process_fulltext(pdf_bytes))
+
+
+def get_embedded_grobid(jar_path, grobid_home, heap_mb=2048):
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EmbeddedGrobid(jar_path, grobid_home, heap_mb)
+        return _engine
@@ -0,0 +1,51 @@
+"""
+Extraction en mémoire, utilisable depuis un autre programme Python.
+
+Le PDF est passé en octets ou en fichier ouvert (upload reçu par un service web,
+par exemple) et le résultat est rendu directement : aucun fichier n'est écrit, aucun
+dossier n'est parcouru, et l'import du module n'a aucun effet de bord. Le backend
+est soit un service GROBID déjà démarré, soit le moteur embarqué
+(`embedded_grobid.get_embedded_grobid`).
+
+    from grobid_api import parse_document
+
+    with open("article.pdf", "rb") as f:
+        document = parse_document(f)
+    print(document.coherence["missing_in_bibliography"])
+"""
+
+import collections
+import os
+
+from coherence import check_coherence
+from grobid_service import GROBID_URL, process_pdf_data
+from tei_utils import derive_references_tei, parse_tei
+
+ParsedDocument = collections.namedtuple("ParsedDocument", ["tei", "root", "references_tei", "coherence"])
+
+
+def read_pdf(pdf):
+    # Octets du PDF et nom à transmettre à GROBID
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return bytes(pdf), "document.pdf"
+    name = getattr(pdf, "name", None)
+    return pdf.read(), os.path.basename(name) if isinstance(name, str) else "document.pdf"
+
+
+def extract_tei(pdf, url=GROBID_URL, timeout=300, engine=None):
+    # TEI complet du PDF, par le moteur embarqué `engine` s'il est fourni, sinon par
+    # le service GROBID à l'adresse `url`
+    pdf_data, pdf_name = read_pdf(pdf)
+    if engine is not None:
+        return engine.process_fulltext(pdf_data)
+    return process_pdf_data(pdf_data, pdf_name, "processFullText", url, timeout)
+
+
+def parse_document(pdf, url=GROBID_URL, timeout=300, engine=None):
+    tei = extract_tei(pdf, url, timeout, engine)
+    return ParsedDocument(
+        tei=tei,
+        root=parse_tei(tei),
+        references_tei=derive_references_tei(tei),
+        coherence=check_coherence(tei),
+    )
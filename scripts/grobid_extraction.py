@@ -3,14 +3,65 @@ Ce script permet d'extraire les références bibliographiques et le texte comple
 
 A noter que GROBID doit être configuré pour fonctionner correctement.
 
+Par défaut, le script utilise le service HTTP de GROBID (démarré une seule fois et
+gardé actif entre deux exécutions) et revient au mode batch (un lancement de la JVM
+par exécution) si le service n'est pas disponible.
+
 Exemple d'utilisation (à exécuter depuis la racine du projet) :
 python scripts/grobid_extraction.py
+python scripts/grobid_extraction.py --mode batch
 """
 
+import argparse
+import hashlib
+import json
 import os
+import posixpath
 import subprocess
+import sys
+import tempfile
+import threading
+import time
 import urllib.request
+import xml.etree.ElementTree as ET
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from archive_input import ARCHIVE_ERRORS, iter_archive_pdfs
+from chunking import split_pdf
+from coherence import check_coherence, report_file_name, write_coherence_report
+from compression import compress_output, compressed_name, open_output, remove_variants, zstandard_available
+from dispatch import dispatch
+from embedded_grobid import EmbeddedGrobidError, get_embedded_grobid
+from grobid_api import extract_tei
+from grobid_service import GROBID_URL, is_grobid_alive, process_pdf, process_pdf_data, start_grobid_service
+from job_queue import JobQueue
+from jvm_tuning import (
+    JVM_BASE_HEAP_MB,
+    auto_size,
+    document_threads,
+    estimate_document_mb,
+    gc_log_options,
+    learn_document_memory,
+    load_profile,
+    read_gc_log,
+    recommend_heap_per_thread,
+    save_profile,
+    summarize_gc,
+)
+from ledger import Ledger
+from light_extraction import run_light_extraction
+from manifest import load_manifest, plan_extraction, prune_outputs, record_extraction, save_manifest, sha256_file
+from preflight import preflight, route_documents
+from progress import print_event, stream_command
+from quarantine import QUARANTINE_PATH, quarantine_pdf
+from resilience import CircuitBreaker, backoff_delay, is_backend_error
+from scheduler import BULK, INTERACTIVE, Scheduler, estimate_cost, estimate_pages
+from tei_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, cache_get, cache_key, cache_put
+from tei_store import TeiStore
+from tei_utils import derive_references_tei, stitch_tei
+from watcher import watch_pdfs
 
 def grobid_decorator(func):
     def wrapper(*args, **kwargs):
@@ -72,27 +123,292 @@ def run_gradlew(base_path):
         print(e.stderr)
 
 @grobid_decorator
-def run_grobid_command(command, command_args):
+def run_grobid_command(command, command_args, heap_mb=2048, jvm_options=(), on_event=print_event, stall_timeout=None,
+                       document_timeout=None):
+    # Préparation de la commande complète
+    command = [
+        "java",
+        f"-Xmx{heap_mb}M",
+        *jvm_options,
+        f"-Djava.library.path={base_path}/grobid-home/lib/lin-64:{base_path}/grobid-home/lib/lin-64/jep",
+        "-jar", f"{base_path}/grobid-core/build/libs/grobid-core-{grobid_version}-onejar.jar"
+    ] + command_args
+
+    # Documents traités et sorties attendues, pour les événements par document
+    input_path = command_args[command_args.index("-dIn") + 1]
+    output_path = command_args[command_args.index("-dOut") + 1]
+    exe = command_args[command_args.index("-exe") + 1]
+    documents = sorted(name for name in os.listdir(input_path) if name.lower().endswith(".pdf"))
+
+    # Exécution de la commande, sorties lues au fil de l'eau
+    start = time.monotonic()
+    returncode, stderr_tail = stream_command(
+        command,
+        documents,
+        lambda document: complete_output_size(os.path.join(output_path, output_file_name(document, exe))),
+        on_event,
+        stall_timeout,
+        document_timeout=document_timeout,
+    )
+    if returncode == 0:
+        print(f"Commande exécutée avec succès ({len(documents)} PDF(s) en {time.monotonic() - start:.1f} s).")
+    else:
+        print(f"Erreur lors de l'exécution de la commande (code {returncode}) :")
+        print("\n".join(stderr_tail))
+
+def complete_output_size(path):
+    # Taille d'un TEI écrit par le mode batch, ou None tant qu'il n'existe pas ou
+    # n'est pas complet (balise </TEI> finale pas encore écrite)
     try:
-        # Préparation de la commande complète
-        command = [
-            "java",
-            "-Xmx2G",
-            f"-Djava.library.path={base_path}/grobid-home/lib/lin-64:{base_path}/grobid-home/lib/lin-64/jep",
-            "-jar", f"{base_path}/grobid-core/build/libs/grobid-core-0.8.2-SNAPSHOT-onejar.jar"
-        ] + command_args
-        
-        # Exécution de la commande
-        result = subprocess.run(command, check=True, text=True, capture_output=True)
-        print("Commande exécutée avec succès :")
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("Erreur lors de l'exécution de la commande :")
-        print(e.stderr)
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 64))
+            return size if b"</TEI>" in f.read() else None
+    except FileNotFoundError:
+        return None
+
+def output_file_name(pdf_name, exe):
+    # Même nommage que le mode batch de GROBID
+    stem = os.path.splitext(pdf_name)[0]
+    if exe == "processReferences":
+        return f"{stem}.references.tei.xml"
+    return f"{stem}.tei.xml"
+
+def list_pdfs(data_path):
+    return sorted(name for name in os.listdir(data_path) if name.lower().endswith(".pdf"))
+
+def write_references_tei(output_path, fulltext_name):
+    # Le TEI des références est découpé dans le TEI complet au lieu de relancer
+    # processReferences sur le PDF
+    with open_output(output_path, fulltext_name) as f:
+        references = derive_references_tei(f)
+    references_name = fulltext_name[: -len(".tei.xml")] + ".references.tei.xml"
+    with open(os.path.join(output_path, references_name), "w", encoding="utf-8") as f:
+        f.write(references)
+    return references_name
+
+def write_document_tei(output_path, pdf_name, exe, tei):
+    path = os.path.join(output_path, output_file_name(pdf_name, exe))
+    # Une ancienne version compressée serait lue à la place du nouveau TEI
+    remove_variants(path, keep=path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(tei)
+
+def finalize_document(output_path, pdf_name, exe, compression=None, on_state=None):
+    # Étapes en aval de l'extraction d'un document : TEI des références,
+    # vérification de cohérence puis compression des TEI. Lancées dès que le TEI du
+    # document est écrit ; `on_state(pdf_name, état)` suit l'avancement
+    fulltext_name = output_file_name(pdf_name, exe)
+    report = None
+    tei_names = [fulltext_name]
+    if exe == "processFullText":
+        tei_names.append(write_references_tei(output_path, fulltext_name))
+        if on_state is not None:
+            on_state(pdf_name, "parsed")
+        report = write_coherence_report(output_path, fulltext_name)
+    for name in tei_names:
+        compress_output(os.path.join(output_path, name), compression)
+    if on_state is not None:
+        on_state(pdf_name, "validated")
+    return report
+
+def print_report(pdf_name, report):
+    print(
+        f"{pdf_name} : {report['citations']} citation(s), {report['references']} référence(s), "
+        f"{len(report['missing_in_bibliography'])} absente(s) de la bibliographie, "
+        f"{len(report['uncited_references'])} jamais citée(s)."
+    )
+
+def document_outputs(pdf_name, exe, compression=None):
+    outputs = [compressed_name(output_file_name(pdf_name, exe), compression)]
+    if exe == "processFullText":
+        outputs.append(compressed_name(output_file_name(pdf_name, "processReferences"), compression))
+        outputs.append(report_file_name(output_file_name(pdf_name, exe)))
+    return outputs
+
+@grobid_decorator
+def run_grobid_service(base_path, pdf_names, data_path, output_path, exe, url=GROBID_URL, concurrency=4, timeout=300,
+                       on_extracted=None, retries=0, backoff=2.0, breaker=None, memory=None, memory_budget=None):
+    # Retourne None si le service est indisponible, pour basculer sur le mode batch,
+    # sinon la liste des PDFs traités et les erreurs des PDFs en échec. Avec
+    # `memory(pdf_name)`, les documents en cours tiennent dans `memory_budget` Mo
+    if not start_grobid_service(base_path, url):
+        return None
+
+    os.makedirs(output_path, exist_ok=True)
+
+    def extract_one(pdf_name):
+        tei = process_pdf(os.path.join(data_path, pdf_name), exe, url, timeout)
+        write_document_tei(output_path, pdf_name, exe, tei)
+        if on_extracted is not None:
+            on_extracted(pdf_name)
+
+    return dispatch_extraction(pdf_names, extract_one, concurrency, timeout, retries, backoff, breaker, memory,
+                               memory_budget)
+
+def dispatch_extraction(pdf_names, extract_one, concurrency, timeout, retries, backoff, breaker, memory=None,
+                        memory_budget=None):
+    processed = []
+    failures = {}
+    for outcome in dispatch(pdf_names, extract_one, concurrency, timeout, retries, backoff, breaker, memory,
+                            memory_budget):
+        if outcome.error is not None:
+            print(f"Erreur lors du traitement de {outcome.item} ({outcome.attempts} essai(s)) : {outcome.error}")
+            failures[outcome.item] = outcome.error
+        else:
+            print(f"{outcome.item} traité en {outcome.elapsed:.1f} s.")
+            processed.append(outcome.item)
+    return processed, failures
+
+@grobid_decorator
+def run_grobid_embedded(base_path, pdf_names, data_path, output_path, exe, heap_mb=2048, on_extracted=None,
+                        retries=0, backoff=2.0, breaker=None):
+    # GROBID chargé dans le processus (pyjnius) : retourne None si le moteur ne peut
+    # pas être créé, sinon la liste des PDFs traités et les erreurs des PDFs en échec
+    try:
+        grobid = get_embedded_grobid(
+            f"{base_path}/grobid-core/build/libs/grobid-core-{grobid_version}-onejar.jar",
+            f"{base_path}/grobid-home",
+            heap_mb,
+        )
+    except (EmbeddedGrobidError, OSError) as e:
+        print(f"GROBID embarqué indisponible : {e!r}")
+        return None
+    process = grobid.process_references if exe == "processReferences" else grobid.process_fulltext
+
+    os.makedirs(output_path, exist_ok=True)
+
+    def extract_one(pdf_name):
+        with open(os.path.join(data_path, pdf_name), "rb") as f:
+            tei = process(f.read())
+        write_document_tei(output_path, pdf_name, exe, tei)
+        if on_extracted is not None:
+            on_extracted(pdf_name)
+
+    # Le moteur traite un document à la fois, sans délai maximal : un appel GROBID ne
+    # peut pas être interrompu
+    return dispatch_extraction(pdf_names, extract_one, 1, None, retries, backoff, breaker)
+
+def grobid_batch_args(input_path, output_path, exe, threads=None):
+    command_args = [
+        "-gH", "grobid/grobid-home",
+        "-dIn", input_path,
+        "-dOut", output_path,
+        "-exe", exe
+    ]
+    if threads:
+        command_args += ["-n", str(threads)]
+    return command_args
+
+def partition_shards(pdf_paths, shards, weight=os.path.getsize):
+    # Répartition gloutonne des PDFs, du plus lourd au plus léger (taille, ou mémoire
+    # estimée), vers le lot le moins chargé : les lots ont des poids cumulés proches
+    shards = max(1, min(shards, len(pdf_paths)))
+    loads = [0] * shards
+    partition = [[] for _ in range(shards)]
+    for path in sorted(pdf_paths, key=weight, reverse=True):
+        index = loads.index(min(loads))
+        partition[index].append(path)
+        loads[index] += weight(path)
+    return partition
+
+def run_grobid_batch(pdf_names, data_path, output_path, exe, shards=None, heap_mb=None, threads=None,
+                     on_event=print_event, stall_timeout=None, on_extracted=None, document_timeout=None, pages=None):
+    # Le mode batch traite un dossier entier : chaque lot reçoit un dossier
+    # temporaire qui ne contient (par liens symboliques) que ses PDFs, et tourne
+    # dans sa propre JVM avec sa part de la mémoire. Les valeurs non fournies sont
+    # déduites de la machine et des journaux GC des exécutions précédentes. Avec le
+    # nombre de pages des documents (`pages`), les lots sont équilibrés en mémoire
+    # estimée et chaque JVM n'a que les threads que ses plus gros documents permettent
+    os.makedirs(output_path, exist_ok=True)
+    profile_path = os.path.join(base_path, "jvm-tuning.json")
+    profile = load_profile(profile_path)
+    auto_shards, auto_heap_mb, auto_threads = auto_size(len(pdf_names), profile["heap_per_thread_mb"])
+    threads = threads or auto_threads
+
+    pdf_paths = [os.path.join(data_path, name) for name in pdf_names]
+    if pages:
+        def estimate(path):
+            return estimate_document_mb(pages[os.path.basename(path)], profile)
+        partition = partition_shards(pdf_paths, shards or auto_shards, estimate)
+    else:
+        partition = partition_shards(pdf_paths, shards or auto_shards)
+    shard_heap_mb = max(1024, heap_mb // len(partition)) if heap_mb else auto_heap_mb
+    shard_threads = [
+        document_threads([estimate(path) for path in shard], shard_heap_mb, threads) if pages else threads
+        for shard in partition
+    ]
+    print(f"Mode batch : {len(partition)} JVM de {shard_heap_mb} Mo, {', '.join(map(str, shard_threads))} thread(s).")
+
+    # Les anciennes sorties des PDFs modifiés seraient prises pour des documents terminés
+    # (et leurs versions compressées seraient lues à la place des nouvelles)
+    for pdf_name in pdf_names:
+        remove_variants(os.path.join(output_path, output_file_name(pdf_name, exe)))
+
+    # Documents terminés d'après les événements : avec --compress, le TEI brut est
+    # déjà remplacé par sa version compressée à la fin de l'exécution
+    finished = set()
+
+    def handle_event(event):
+        on_event(event)
+        if event.kind == "finish":
+            finished.add(event.document)
+            if on_extracted is not None:
+                on_extracted(event.document)
+
+    with tempfile.TemporaryDirectory(prefix="grobid-in-") as input_root:
+        shard_commands = []
+        gc_logs = []
+        for index, shard in enumerate(partition):
+            input_path = os.path.join(input_root, f"shard-{index}")
+            os.mkdir(input_path)
+            for pdf_path in shard:
+                os.symlink(pdf_path, os.path.join(input_path, os.path.basename(pdf_path)))
+            gc_logs.append(os.path.join(input_root, f"gc-{index}.log"))
+            shard_commands.append(
+                (grobid_batch_args(input_path, output_path, exe, shard_threads[index]), gc_log_options(gc_logs[-1]))
+            )
+
+        # Les lots écrivent tous dans output/ : les noms de sortie sont distincts
+        with ThreadPoolExecutor(max_workers=len(partition) or 1) as executor:
+            list(executor.map(
+                lambda shard_command: run_grobid_command(
+                    shard_command[0], shard_heap_mb, shard_command[1], handle_event, stall_timeout, document_timeout
+                ),
+                shard_commands,
+            ))
+
+        gc_stats = [read_gc_log(gc_log, shard_heap_mb) for gc_log in gc_logs]
+        summary = summarize_gc(gc_stats)
+
+    if summary is not None and os.path.isdir(base_path):
+        recommended = recommend_heap_per_thread(summary, profile["heap_per_thread_mb"])
+        print(f"GC : pression mémoire {summary['pressure']:.0%}, {summary['pause_ratio']:.1%} du temps en pause.")
+        if recommended != profile["heap_per_thread_mb"]:
+            if heap_mb:
+                print(f"Recommandation : --heap {(JVM_BASE_HEAP_MB + threads * recommended) * len(partition)}")
+            else:
+                print(f"Mémoire par thread ajustée à {recommended} Mo pour la prochaine exécution.")
+                profile["heap_per_thread_mb"] = recommended
+        # Coût mémoire par page appris sur l'occupation maximale de chaque JVM
+        if pages:
+            for shard, stats, shard_thread_count in zip(partition, gc_stats, shard_threads):
+                if stats is not None:
+                    learn_document_memory(profile, [pages[os.path.basename(path)] for path in shard],
+                                          shard_thread_count, stats["peak_mb"])
+        profile["runs"] = (profile["runs"] + [{
+            "shards": len(partition), "heap_mb": shard_heap_mb, "threads": threads, **summary,
+        }])[-20:]
+        save_profile(profile_path, profile)
+
+    return [pdf_name for pdf_name in pdf_names if pdf_name in finished]
 
 # Chemin de base pour grobid
 base_path = "grobid"
 
+# Version de GROBID compilée (utilisée pour le chemin du jar et le manifeste)
+grobid_version = "0.8.2-SNAPSHOT"
+
 # Chemins pour data et output (relatifs à la racine du projet)
 data_path = "data/"
 output_path = "output/"
@@ -101,21 +417,736 @@ output_path = "output/"
 data_path = os.path.abspath("data/")
 output_path = os.path.abspath("output/")
 
-# Commande pour extraire les références bibliographiques au format XML
-command_args1 = [
-    "-gH", "grobid/grobid-home",
-    "-dIn", data_path,
-    "-dOut", output_path,
-    "-exe", "processReferences"
-]
-
-# Commande pour obtenir l'article complet au format XML
-command_args2 = [
-    "-gH", "grobid/grobid-home",
-    "-dIn", data_path,
-    "-dOut", output_path,
-    "-exe", "processFullText"
-]
-
-# Exécution de la commande avec le décorateur
-run_grobid_command(command_args2)
\ No newline at end of file
+# Sous-dossier de data/ pour les PDFs à traiter avant tous les autres
+INTERACTIVE_DIR = "interactive"
+
+# Commande pour obtenir l'article complet au format XML (les références
+# bibliographiques sont dérivées du TEI complet)
+exe = "processFullText"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction des PDFs de data/ avec GROBID.")
+    parser.add_argument("--light", action="store_true",
+                        help="extraction rapide des références sans GROBID (PyPDF2 et regex), pour un premier tri")
+    parser.add_argument("--mode", choices=["auto", "service", "batch", "embedded"], default="auto",
+                        help="service HTTP, batch (java -jar), service avec repli sur le batch, ou GROBID "
+                             "embarqué dans le processus (pyjnius)")
+    parser.add_argument("--url", default=GROBID_URL, help="adresse du service GROBID")
+    parser.add_argument("--concurrency", type=int, default=min(10, os.cpu_count() or 1),
+                        help="nombre de documents envoyés simultanément au service")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="délai maximal par document (secondes), sans effet en --mode embedded")
+    parser.add_argument("--shards", type=int,
+                        help="nombre de JVM lancées en parallèle en mode batch (automatique par défaut)")
+    parser.add_argument("--heap", type=int,
+                        help="mémoire totale des JVM du mode batch (Mo), partagée entre les lots (automatique par défaut)")
+    parser.add_argument("--threads", type=int,
+                        help="threads GROBID par JVM en mode batch (automatique par défaut)")
+    parser.add_argument("--heap-budget", type=int, default=2048,
+                        help="mémoire disponible pour l'extraction, en Mo : les documents envoyés en même temps "
+                             "doivent y tenir d'après leur mémoire estimée. Appliquée comme -Xmx de la JVM "
+                             "embarquée ; en mode service, elle n'est pas transmise au service et doit "
+                             "correspondre à son propre -Xmx")
+    parser.add_argument("--stall-timeout", type=float,
+                        help="signaler une absence de progression du mode batch au-delà de ce délai (secondes)")
+    parser.add_argument("--force", action="store_true", help="ré-extraire tous les PDFs, même inchangés")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="dossier du cache TEI partagé")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // 1024 ** 2,
+                        help="taille maximale du cache TEI (Mo)")
+    parser.add_argument("--no-cache", action="store_true", help="ne pas utiliser le cache TEI partagé")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="envoyer les PDFs à GROBID sans contrôle préalable")
+    parser.add_argument("--chunk-pages", type=int, default=0,
+                        help="découper les gros PDFs en morceaux de N pages extraits en parallèle")
+    parser.add_argument("--retries", type=int, default=2, help="nombre de reprises d'un document en échec")
+    parser.add_argument("--backoff", type=float, default=2.0,
+                        help="délai avant la première reprise (secondes), doublé à chaque reprise")
+    parser.add_argument("--max-failure-rate", type=float, default=0.5,
+                        help="arrêter l'exécution si la part d'échecs sur les 20 derniers documents atteint ce taux")
+    parser.add_argument("--watch", action="store_true",
+                        help="après le traitement de data/, surveiller le dossier et traiter les PDFs dès leur arrivée")
+    parser.add_argument("--debounce", type=float, default=1.0,
+                        help="délai sans écriture avant de traiter un PDF arrivé (secondes)")
+    parser.add_argument("--round-size", type=int, default=50,
+                        help="en mode --watch, nombre maximal de documents de masse traités avant de reprendre "
+                             "les PDFs interactifs arrivés entre-temps")
+    parser.add_argument("--aging", type=float, default=0.1,
+                        help="baisse du coût estimé (en pages) d'un document par seconde d'attente")
+    parser.add_argument("--queue-url",
+                        help="répartir l'extraction via une file Redis (ex. redis://localhost:6379/0)")
+    parser.add_argument("--queue-name", default="grobid", help="préfixe des clés Redis de la file")
+    parser.add_argument("--queue-window", type=int, default=64,
+                        help="nombre maximal de PDFs déposés dans la file en même temps")
+    parser.add_argument("--worker", action="store_true",
+                        help="travailleur : traiter les PDFs de la file Redis avec le service GROBID local")
+    parser.add_argument("--visibility-timeout", type=float, default=600,
+                        help="durée de location d'un travail, prolongée tant que le travailleur est actif (secondes)")
+    parser.add_argument("--progress", action="store_true",
+                        help="afficher l'avancement et le débit de l'exécution en cours (ou de la dernière), puis quitter")
+    parser.add_argument("--compress", choices=["gz", "zst"],
+                        help="compresser les TEI produits (.tei.xml.gz, ou .tei.xml.zst avec le module zstandard)")
+    parser.add_argument("--store",
+                        help="ranger les sorties dans une base LMDB (dossier) plutôt qu'en fichiers dans output/")
+    parser.add_argument("--export-store", action="store_true",
+                        help="réécrire dans output/ les fichiers de la base --store, puis quitter")
+    parser.add_argument("--archive", action="append",
+                        help="traiter les PDFs d'une archive tar (.tar, .tar.gz...) ou zip sans la décompresser sur "
+                             "le disque ; sorties dans output/<nom de l'archive>/ (option répétable)")
+    parser.add_argument("--pipe", choices=["tei", "report"],
+                        help="lire un PDF sur l'entrée standard et écrire son TEI, ou son rapport de cohérence en "
+                             "une ligne JSON, sur la sortie standard, sans aucun fichier (service déjà démarré ou "
+                             "--mode embedded)")
+    parser.add_argument("--quarantine-dir", default=QUARANTINE_PATH,
+                        help="dossier où sont déplacés les PDFs rejetés")
+    return parser.parse_args(argv)
+
+def extract_documents(pdf_names, args, on_extracted, concurrency, breaker, input_path=data_path, out_path=output_path,
+                      pages=None):
+    # Service HTTP, avec repli sur le mode batch. Retourne les PDFs traités et les
+    # erreurs des PDFs en échec après toutes les reprises. `pages` (nombre de pages
+    # par PDF) permet de répartir les documents selon leur mémoire estimée
+    if not pdf_names:
+        return [], {}
+    if args.queue_url:
+        return run_queue_coordinator(pdf_names, input_path, out_path, args, on_extracted, breaker)
+    if args.mode == "embedded":
+        result = run_grobid_embedded(
+            pdf_names, input_path, out_path, exe, args.heap_budget,
+            on_extracted=on_extracted, retries=args.retries, backoff=args.backoff, breaker=breaker,
+        )
+        return result if result is not None else ([], {})
+    if args.mode != "batch":
+        memory = None
+        if pages:
+            profile = load_profile(os.path.join(base_path, "jvm-tuning.json"))
+
+            def memory(pdf_name):
+                return estimate_document_mb(pages[pdf_name], profile)
+        result = run_grobid_service(
+            pdf_names, input_path, out_path, exe, args.url, concurrency, args.timeout,
+            on_extracted=on_extracted, retries=args.retries, backoff=args.backoff, breaker=breaker,
+            memory=memory, memory_budget=args.heap_budget - JVM_BASE_HEAP_MB,
+        )
+        if result is not None:
+            return result
+        if args.mode == "service":
+            print("Service GROBID indisponible.")
+            return [], {}
+        print("Service GROBID indisponible, utilisation du mode batch.")
+        # Inutile d'attendre à nouveau le service pour les files suivantes
+        args.mode = "batch"
+
+    # Mode batch : un document qui dépasse son délai arrête sa JVM ; les documents en
+    # échec ou interrompus sont relancés dans une nouvelle JVM
+    processed = []
+    failures = {}
+    remaining = list(pdf_names)
+    for attempt in range(args.retries + 1):
+        round_failures = {}
+
+        def handle_event(event):
+            print_event(event)
+            if event.kind == "failure":
+                round_failures[event.document] = event.detail
+                breaker.record(False)
+            elif event.kind == "finish":
+                breaker.record(True)
+
+        # Les documents déjà en échec repassent dans leur propre JVM, pour ne plus
+        # interrompre les autres
+        suspects = [pdf_name for pdf_name in remaining if pdf_name in failures]
+        others = [pdf_name for pdf_name in remaining if pdf_name not in failures]
+        for group in (others, suspects):
+            if group and not breaker.open:
+                processed += run_grobid_batch(
+                    group, input_path, out_path, exe, args.shards, args.heap, args.threads,
+                    on_event=handle_event, stall_timeout=args.stall_timeout, on_extracted=on_extracted,
+                    document_timeout=args.timeout, pages=pages,
+                )
+        failures.update(round_failures)
+        remaining = [pdf_name for pdf_name in remaining if pdf_name not in processed]
+        if not remaining or breaker.open:
+            break
+        if attempt < args.retries:
+            time.sleep(backoff_delay(attempt, args.backoff))
+
+    # Les documents interrompus sans avoir échoué eux-mêmes ne sont pas mis en cause
+    return processed, {pdf_name: failures[pdf_name] for pdf_name in remaining if pdf_name in failures}
+
+def run_queue_coordinator(pdf_names, input_path, out_path, args, on_extracted, breaker):
+    # Les PDFs sont déposés dans la file Redis par fenêtres de `queue_window`
+    # travaux, pour borner la mémoire occupée dans Redis ; les TEI rendus par les
+    # travailleurs sont écrits dans out_path
+    queue = JobQueue.from_url(args.queue_url, name=args.queue_name, max_attempts=args.retries + 1)
+    os.makedirs(out_path, exist_ok=True)
+    waiting = list(pdf_names)
+    in_flight = {}
+    processed = []
+    failures = {}
+    idle_since = time.monotonic()
+    # Sans aucun résultat pendant ce délai, les travailleurs sont considérés absents
+    max_idle = args.timeout * (args.retries + 1)
+
+    while waiting or in_flight:
+        while waiting and len(in_flight) < args.queue_window and not breaker.open:
+            pdf_name = waiting.pop(0)
+            with open(os.path.join(input_path, pdf_name), "rb") as f:
+                in_flight[queue.enqueue(pdf_name, f.read())] = pdf_name
+        if breaker.open or time.monotonic() - idle_since > max_idle:
+            if not breaker.open:
+                print(f"Aucun résultat depuis {max_idle:.0f} s : travailleurs absents ?")
+            for job_id in in_flight:
+                queue.cancel(job_id)
+            break
+
+        job_id = queue.wait_done()
+        if job_id is None or job_id not in in_flight:
+            continue
+        idle_since = time.monotonic()
+        pdf_name = in_flight.pop(job_id)
+        tei, error = queue.pop_result(job_id)
+        if error is not None:
+            print(f"Erreur lors du traitement de {pdf_name} : {error}")
+            failures[pdf_name] = error
+            breaker.record(False)
+            continue
+        write_document_tei(out_path, pdf_name, exe, tei)
+        print(f"{pdf_name} traité.")
+        breaker.record(True)
+        if on_extracted is not None:
+            on_extracted(pdf_name)
+        processed.append(pdf_name)
+    return processed, failures
+
+@grobid_decorator
+def run_queue_worker(base_path, args):
+    # Travailleur : prend les travaux de la file Redis et les envoie au service
+    # GROBID local, `concurrency` travaux à la fois
+    if not start_grobid_service(base_path, args.url):
+        print("Service GROBID indisponible : le travailleur s'arrête.")
+        return
+    queue = JobQueue.from_url(args.queue_url, name=args.queue_name, visibility_timeout=args.visibility_timeout,
+                              max_attempts=args.retries + 1)
+    print(f"Travailleur prêt ({args.concurrency} travaux simultanés).")
+
+    def keep_lease(job_id, finished):
+        # Prolonge la location tant que le travail est en cours
+        while not finished.wait(args.visibility_timeout / 3):
+            queue.extend(job_id)
+
+    def work():
+        backend_failures = 0
+        while True:
+            job = queue.claim()
+            if job is None:
+                time.sleep(1)
+                continue
+            job_id, pdf_name, pdf_data = job
+            finished = threading.Event()
+            threading.Thread(target=keep_lease, args=(job_id, finished), daemon=True).start()
+            try:
+                tei = process_pdf_data(pdf_data, pdf_name, exe, args.url, args.timeout)
+            except Exception as e:
+                print(f"Erreur lors du traitement de {pdf_name} : {e}")
+                if is_backend_error(e):
+                    # Le service local est en panne : le travail est rendu sans
+                    # consommer d'essai, et le travailleur attend avant d'en reprendre
+                    finished.set()
+                    queue.release(job_id)
+                    time.sleep(backoff_delay(backend_failures, args.backoff))
+                    backend_failures += 1
+                    continue
+                backend_failures = 0
+                queue.fail(job_id, repr(e))
+            else:
+                backend_failures = 0
+                print(f"{pdf_name} traité.")
+                queue.complete(job_id, tei)
+            finally:
+                finished.set()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(work) for _ in range(args.concurrency)]:
+            future.result()
+
+def run_chunked_extraction(pdf_names, args, on_extracted, breaker):
+    # Chaque gros PDF est découpé en morceaux extraits en parallèle, dont les TEI
+    # sont réassemblés en un seul document
+    processed = []
+    failures = {}
+    for pdf_name in pdf_names:
+        with tempfile.TemporaryDirectory(prefix="grobid-chunks-") as chunk_root:
+            chunk_dir = os.path.join(chunk_root, "in")
+            chunk_output = os.path.join(chunk_root, "out")
+            chunk_names = split_pdf(os.path.join(data_path, pdf_name), args.chunk_pages, chunk_dir)
+            print(f"{pdf_name} découpé en {len(chunk_names)} morceau(x).")
+            done, chunk_failures = extract_documents(
+                chunk_names, args, None, args.concurrency, breaker, chunk_dir, chunk_output
+            )
+            if len(done) != len(chunk_names):
+                print(f"Erreur lors du traitement de {pdf_name} : {len(chunk_names) - len(done)} morceau(x) en échec.")
+                # Le document n'est en cause que si un morceau a échoué pour une autre
+                # raison que le backend ; sinon l'erreur du backend le laisse à extraire
+                document_errors = [error for error in chunk_failures.values() if not is_backend_error(error)]
+                if document_errors:
+                    failures[pdf_name] = document_errors[0]
+                elif chunk_failures:
+                    failures[pdf_name] = next(iter(chunk_failures.values()))
+                continue
+            chunk_teis = []
+            for chunk_name in chunk_names:
+                with open(os.path.join(chunk_output, output_file_name(chunk_name, exe)), encoding="utf-8") as f:
+                    chunk_teis.append(f.read())
+        write_document_tei(output_path, pdf_name, exe, stitch_tei(chunk_teis))
+        if on_extracted is not None:
+            on_extracted(pdf_name)
+        processed.append(pdf_name)
+    return processed, failures
+
+@grobid_decorator
+def archive_backend(base_path, args):
+    # Fonction d'extraction (contenu, nom du PDF) -> TEI des PDFs lus dans une
+    # archive : le service HTTP ou le moteur embarqué, qui prennent le PDF en mémoire
+    # (le mode batch ne lit que des dossiers). None si le backend est indisponible
+    if args.mode == "embedded":
+        try:
+            grobid = get_embedded_grobid(
+                f"{base_path}/grobid-core/build/libs/grobid-core-{grobid_version}-onejar.jar",
+                f"{base_path}/grobid-home",
+                args.heap_budget,
+            )
+        except (EmbeddedGrobidError, OSError) as e:
+            print(f"GROBID embarqué indisponible : {e!r}")
+            return None
+        return lambda pdf_data, pdf_name: grobid.process_fulltext(pdf_data)
+    if not start_grobid_service(base_path, args.url):
+        print("Service GROBID indisponible (le mode batch ne lit pas les archives).")
+        return None
+    return lambda pdf_data, pdf_name: process_pdf_data(pdf_data, pdf_name, exe, args.url, args.timeout)
+
+def extract_archive(archive_path, args, params):
+    # Les PDFs de l'archive sont lus un par un et extraits par fenêtres de
+    # --concurrency documents, seuls gardés en mémoire ; les sorties sont rangées
+    # par chemin dans l'archive : output/<archive>.tar.gz/<dossier>/<nom>.tei.xml
+    process = archive_backend(args)
+    if process is None:
+        return
+    # Le moteur embarqué traite un document à la fois, sans délai maximal
+    embedded = args.mode == "embedded"
+    concurrency = 1 if embedded else max(1, args.concurrency)
+    out_path = os.path.join(output_path, os.path.basename(archive_path))
+    breaker = CircuitBreaker(max_failure_rate=args.max_failure_rate)
+    downstream = ThreadPoolExecutor(max_workers=2)
+    downstream_futures = {}
+    failures = {}
+    seen = set()
+    readable = True
+    members = iter_archive_pdfs(archive_path)
+    print(f"Lecture de {archive_path}...")
+
+    try:
+        while readable and not breaker.open:
+            window = {}
+            try:
+                for name, pdf_data in members:
+                    # Un même chemin peut apparaître plusieurs fois dans une archive tar
+                    if name in seen:
+                        print(f"{name} présent plusieurs fois dans l'archive : "
+                              "seule la première occurrence est traitée.")
+                        continue
+                    seen.add(name)
+                    window[name] = pdf_data
+                    if len(window) >= concurrency:
+                        break
+            except ARCHIVE_ERRORS as e:
+                # Les PDFs déjà lus sont traités, la suite de l'archive est perdue
+                print(f"Archive illisible ou tronquée : {archive_path} ({e!r}).")
+                readable = False
+            if not window:
+                break
+            keys = {name: cache_key(hashlib.sha256(pdf_data).hexdigest(), params) for name, pdf_data in window.items()}
+            for name in window:
+                os.makedirs(os.path.dirname(os.path.join(out_path, name)), exist_ok=True)
+
+            def extract_one(name):
+                tei = None if args.no_cache or args.force else cache_get(args.cache_dir, keys[name])
+                if tei is None:
+                    tei = process(window[name], posixpath.basename(name))
+                    if not args.no_cache:
+                        cache_put(args.cache_dir, keys[name], tei, args.cache_size * 1024 ** 2)
+                write_document_tei(out_path, name, exe, tei)
+                downstream_futures[name] = downstream.submit(finalize_document, out_path, name, exe, args.compress)
+
+            _, window_failures = dispatch_extraction(
+                list(window), extract_one, concurrency, None if embedded else args.timeout, args.retries,
+                args.backoff, breaker,
+            )
+            failures.update(window_failures)
+    finally:
+        members.close()
+        downstream.shutdown(wait=True)
+    if breaker.open:
+        print("Trop d'échecs consécutifs : lecture de l'archive interrompue (backend GROBID en panne ?).")
+
+    finalized = 0
+    for name, future in downstream_futures.items():
+        try:
+            report = future.result()
+        except (OSError, ET.ParseError) as e:
+            print(f"Erreur lors de la vérification de {name} : {e!r}")
+            failures[name] = e
+            continue
+        if report is not None:
+            print_report(name, report)
+        finalized += 1
+    print(f"{archive_path} : {finalized} PDF(s) extrait(s) dans {out_path}, {len(failures)} en échec.")
+
+def run_pipe(args):
+    # Mode tube : stdout ne reçoit que le résultat, les messages vont sur stderr ; le
+    # service n'est pas démarré ni GROBID installé, pour ne toucher à aucun fichier.
+    # Retourne le code de sortie du script
+    engine = None
+    try:
+        if args.mode == "embedded":
+            engine = get_embedded_grobid(
+                f"{base_path}/grobid-core/build/libs/grobid-core-{grobid_version}-onejar.jar",
+                f"{base_path}/grobid-home",
+                args.heap_budget,
+            )
+        elif args.mode == "batch":
+            print("--pipe nécessite le service GROBID ou --mode embedded.", file=sys.stderr)
+            return 2
+        elif not is_grobid_alive(args.url):
+            print(f"Service GROBID indisponible sur {args.url}.", file=sys.stderr)
+            return 1
+        tei = extract_tei(sys.stdin.buffer.read(), args.url, args.timeout, engine)
+        if args.pipe == "tei":
+            sys.stdout.write(tei)
+        else:
+            sys.stdout.write(json.dumps(check_coherence(tei), ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"Erreur lors du traitement du PDF : {e!r}", file=sys.stderr)
+        return 1
+    sys.stdout.flush()
+    return 0
+
+def store_outputs(store, pdf_name, pdf_sha256, params):
+    # Range les sorties du document dans la base LMDB et les retire d'output/
+    outputs = {}
+    for name in document_outputs(pdf_name, exe):
+        with open_output(output_path, name) as f:
+            outputs[name] = f.read().decode("utf-8")
+    store.put(pdf_sha256, pdf_name, outputs, params)
+    for name in outputs:
+        remove_variants(os.path.join(output_path, name))
+
+def outputs_on_disk(pdf_name, compression):
+    return all(os.path.exists(os.path.join(output_path, name)) for name in document_outputs(pdf_name, exe, compression))
+
+def process_documents(pending, args, manifest, params, store=None, ledger=None, infos=None):
+    # Cache, contrôle préalable, extraction et étapes en aval pour les PDFs de
+    # `pending` ; les PDFs traités sont ajoutés au manifeste (et rangés dans `store`
+    # si les sorties sont stockées dans une base LMDB). L'avancement de chaque
+    # document est suivi dans `ledger`
+
+    def set_state(pdf_name, state, error=None):
+        if ledger is not None:
+            ledger.update(pdf_name, state, error=error)
+
+    # Les étapes en aval (références, cohérence) démarrent sur chaque document dès que
+    # son TEI est écrit, pendant que GROBID traite les suivants
+    downstream = ThreadPoolExecutor(max_workers=2)
+    downstream_futures = {}
+
+    def submit_downstream(pdf_name):
+        set_state(pdf_name, "extracted")
+        downstream_futures[pdf_name] = downstream.submit(
+            finalize_document, output_path, pdf_name, exe, args.compress, set_state
+        )
+
+    pdf_hashes = {pdf_name: sha256_file(os.path.join(data_path, pdf_name)) for pdf_name in pending}
+    os.makedirs(output_path, exist_ok=True)
+
+    # Reprise d'une exécution interrompue : chaque document repart de la dernière
+    # étape enregistrée dans le journal, si ses sorties sont toujours là
+    resumed = {} if ledger is None or args.force else ledger.resumable(pending, pdf_hashes, params)
+    reported = []
+    validated = []
+    for pdf_name, state in resumed.items():
+        if state == "reported" and (store.contains(pdf_hashes[pdf_name], params) if store is not None
+                                    else outputs_on_disk(pdf_name, args.compress)):
+            reported.append(pdf_name)
+        elif state == "validated" and outputs_on_disk(pdf_name, args.compress):
+            validated.append(pdf_name)
+        elif state in ("extracted", "parsed") and os.path.exists(os.path.join(output_path, output_file_name(pdf_name, exe))):
+            submit_downstream(pdf_name)
+    resumed = set(reported + validated) | set(downstream_futures)
+    if resumed:
+        print(f"{len(resumed)} PDF(s) repris là où l'exécution précédente s'était arrêtée.")
+    if ledger is not None:
+        for pdf_name in pending:
+            if pdf_name not in resumed:
+                ledger.update(pdf_name, "pending", pdf_hashes[pdf_name], params)
+        ledger.flush()
+
+    # Les PDFs déjà extraits ailleurs sur la machine sont repris du cache partagé
+    cached = []
+    if not args.no_cache and not args.force:
+        for pdf_name in pending:
+            if pdf_name in resumed:
+                continue
+            tei = cache_get(args.cache_dir, cache_key(pdf_hashes[pdf_name], params))
+            if tei is not None:
+                write_document_tei(output_path, pdf_name, exe, tei)
+                submit_downstream(pdf_name)
+                cached.append(pdf_name)
+        if cached:
+            print(f"{len(cached)} PDF(s) repris du cache TEI.")
+    to_extract = [pdf_name for pdf_name in pending if pdf_name not in cached and pdf_name not in resumed]
+
+    # Contrôle préalable : les PDFs illisibles ou scannés sont mis en quarantaine,
+    # les gros documents passent après les autres, chaque file du plus court au plus long
+    # (`infos` : résultats déjà connus du contrôle, par nom de PDF)
+    queues = [to_extract]
+    if to_extract and not args.no_preflight:
+        infos = dict(infos or {})
+        missing = [pdf_name for pdf_name in to_extract if pdf_name not in infos]
+        infos.update((info["name"], info) for info in preflight([os.path.join(data_path, pdf_name) for pdf_name in missing]))
+        rejected, regular, large = route_documents([infos[pdf_name] for pdf_name in to_extract])
+        for info, reason in rejected:
+            quarantine_pdf(data_path, args.quarantine_dir, info["name"], reason, {"preflight": info})
+            set_state(info["name"], "failed", reason)
+        queues = [[info["name"] for info in regular], [info["name"] for info in large]]
+        if large:
+            print(f"{len(large)} gros document(s) traité(s) en dernier.")
+
+    # Nombre de pages de chaque document, pour estimer sa mémoire d'extraction
+    pages = {
+        pdf_name: estimate_pages((infos or {}).get(pdf_name) or {"size": os.path.getsize(os.path.join(data_path, pdf_name))})
+        for queue in queues for pdf_name in queue
+    }
+
+    # Exécution de la commande avec le décorateur ; les gros documents sont envoyés
+    # avec une concurrence réduite
+    breaker = CircuitBreaker(max_failure_rate=args.max_failure_rate)
+    for queue in queues:
+        for pdf_name in queue:
+            set_state(pdf_name, "extracting")
+    processed, failures = extract_documents(queues[0], args, submit_downstream, args.concurrency, breaker, pages=pages)
+    for queue in queues[1:]:
+        if breaker.open:
+            break
+        if args.chunk_pages:
+            queue_processed, queue_failures = run_chunked_extraction(queue, args, submit_downstream, breaker)
+        else:
+            queue_processed, queue_failures = extract_documents(
+                queue, args, submit_downstream, max(1, args.concurrency // 4), breaker, pages=pages
+            )
+        processed += queue_processed
+        failures.update(queue_failures)
+
+    # Disjoncteur ouvert : le backend est probablement en panne, les documents ne
+    # sont pas mis en cause. Les documents non traités (backend en panne ou
+    # indisponible, ou dont seul le backend a échoué) restent à extraire ; seuls les
+    # documents dont l'extraction a eu lieu et a échoué sont mis en quarantaine
+    backend_failures = [pdf_name for pdf_name, error in failures.items() if is_backend_error(error)]
+    if backend_failures and not breaker.open:
+        print(f"{len(backend_failures)} PDF(s) laissé(s) à extraire : backend GROBID injoignable ou saturé.")
+    failures = {pdf_name: error for pdf_name, error in failures.items() if pdf_name not in backend_failures}
+    for queue in queues:
+        for pdf_name in queue:
+            if pdf_name not in processed and (breaker.open or pdf_name not in failures):
+                set_state(pdf_name, "pending")
+    if breaker.open:
+        print("Trop d'échecs consécutifs : exécution interrompue (backend GROBID en panne ?).")
+    else:
+        for pdf_name, error in failures.items():
+            # Le moteur embarqué n'a pas de délai maximal par document : ses échecs ne
+            # suffisent pas à mettre un PDF en cause, qui reste dans data/
+            if args.mode != "embedded":
+                quarantine_pdf(data_path, args.quarantine_dir, pdf_name, f"échec de l'extraction : {error}",
+                               {"retries": args.retries})
+            set_state(pdf_name, "failed", str(error))
+
+    if not args.no_cache:
+        for pdf_name in processed:
+            with open_output(output_path, output_file_name(pdf_name, exe)) as f:
+                tei = f.read().decode("utf-8")
+            cache_put(args.cache_dir, cache_key(pdf_hashes[pdf_name], params), tei, args.cache_size * 1024 ** 2)
+
+    downstream.shutdown(wait=True)
+    finalized = list(validated)
+    for pdf_name in downstream_futures:
+        try:
+            report = downstream_futures[pdf_name].result()
+        except (OSError, ET.ParseError) as e:
+            print(f"Erreur lors de la vérification de {pdf_name} : {e!r}")
+            set_state(pdf_name, "failed", repr(e))
+            continue
+        if report is not None:
+            print_report(pdf_name, report)
+        finalized.append(pdf_name)
+
+    for pdf_name in reported + finalized:
+        if store is not None and pdf_name not in reported:
+            store_outputs(store, pdf_name, pdf_hashes[pdf_name], params)
+        record_extraction(manifest, data_path, pdf_name, params, document_outputs(pdf_name, exe, args.compress),
+                          pdf_hashes[pdf_name])
+        set_state(pdf_name, "reported")
+    if ledger is not None:
+        ledger.flush()
+
+def take_interactive(data_path, pdf_names=None):
+    # Déplace les PDFs de data/interactive/ (tous, ou ceux de `pdf_names`) dans data/
+    # et retourne leurs noms
+    interactive_path = os.path.join(data_path, INTERACTIVE_DIR)
+    if not os.path.isdir(interactive_path):
+        return set()
+    moved = set()
+    for pdf_name in list_pdfs(interactive_path) if pdf_names is None else pdf_names:
+        try:
+            os.replace(os.path.join(interactive_path, pdf_name), os.path.join(data_path, pdf_name))
+        except FileNotFoundError:
+            continue
+        moved.add(pdf_name)
+    return moved
+
+def schedule_documents(scheduler, pdf_names, args, infos, priority):
+    # Coût de chaque document estimé d'après le contrôle préalable (pages et taille),
+    # conservé dans `infos` pour ne pas rouvrir les PDFs au moment de leur traitement
+    if not args.no_preflight:
+        infos.update((info["name"], info) for info in preflight([os.path.join(data_path, name) for name in pdf_names]))
+    for pdf_name in pdf_names:
+        info = infos.get(pdf_name) or {"size": os.path.getsize(os.path.join(data_path, pdf_name))}
+        scheduler.add(pdf_name, estimate_cost(info), priority)
+
+def forward_arrivals(path, priority, debounce, arrivals):
+    for arrived in watch_pdfs(path, debounce):
+        arrivals.put((priority, arrived))
+
+def schedule_arrivals(scheduler, arrival, args, manifest, params, outputs_present, infos):
+    priority, arrived = arrival
+    if priority == INTERACTIVE:
+        arrived = sorted(take_interactive(data_path, arrived))
+    pending, _ = plan_extraction(data_path, output_path, arrived, manifest, params, outputs_present)
+    # Un document déjà en attente n'est reclassé que s'il devient interactif
+    pending = [name for name in pending if name not in scheduler or priority == INTERACTIVE]
+    if pending:
+        label = "interactif(s)" if priority == INTERACTIVE else "à extraire"
+        print(f"{len(pending)} nouveau(x) PDF(s) {label}.")
+        schedule_documents(scheduler, pending, args, infos, priority)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Un PDF sur l'entrée standard, le résultat sur la sortie standard
+    if args.pipe:
+        return run_pipe(args)
+
+    if args.worker:
+        if not args.queue_url:
+            print("--worker nécessite --queue-url.")
+            return
+        run_queue_worker(args)
+        return
+
+    # Premier tri sans GROBID : références et citations relevées dans le texte brut
+    if args.light:
+        pdf_paths = [os.path.join(data_path, pdf_name) for pdf_name in list_pdfs(data_path)]
+        for pdf_name, result, error in run_light_extraction(pdf_paths, output_path):
+            if error is not None:
+                print(f"Erreur lors du traitement de {pdf_name} : {error}")
+            else:
+                print(
+                    f"{pdf_name} : {len(result['references'])} référence(s) dont {result['dois']} DOI et "
+                    f"{result['arxiv_ids']} arXiv, {len(result['citations']['author_year'])} citation(s) "
+                    f"auteur-année, {len(result['citations']['numeric'])} numérique(s)."
+                )
+        return
+
+    # Avancement d'une exécution, éventuellement en cours dans un autre terminal
+    if args.progress:
+        with Ledger(output_path) as ledger:
+            progress = ledger.progress()
+        print(", ".join(f"{state} : {count}" for state, count in progress["states"].items()))
+        print(f"Débit : {progress['per_minute']:.1f} document(s) par minute sur la dernière minute.")
+        return
+
+    if args.compress == "zst" and not zstandard_available():
+        print("--compress zst nécessite le module zstandard (pip install zstandard).")
+        return
+
+    params = {"grobid": grobid_version, "exe": exe}
+
+    # Archives tar ou zip : lues en flux, sans passer par data/
+    if args.archive:
+        for archive_path in args.archive:
+            if not os.path.isfile(archive_path):
+                print(f"Archive introuvable : {archive_path}")
+                continue
+            extract_archive(archive_path, args, params)
+        return
+
+    store = None
+    outputs_present = None
+    if args.export_store and not args.store:
+        print("--export-store nécessite --store.")
+        return
+    if args.store:
+        store = TeiStore(args.store)
+        if args.export_store:
+            with store:
+                print(f"{store.export(output_path)} fichier(s) exporté(s) dans {output_path}.")
+            return
+
+        def outputs_present(pdf_name, entry):
+            metadata = store.metadata(entry["sha256"])
+            return metadata is not None and metadata["params"] == entry["params"] and pdf_name in metadata["names"]
+
+    # Les PDFs déposés dans data/interactive/ passent avant tous les autres
+    interactive = take_interactive(data_path)
+
+    # Seuls les PDFs nouveaux ou modifiés depuis la dernière exécution sont extraits ;
+    # le journal permet de reprendre une exécution interrompue
+    ledger = Ledger(output_path)
+    manifest = {} if args.force else load_manifest(output_path)
+    pdf_names = list_pdfs(data_path)
+    pending, removed = plan_extraction(data_path, output_path, pdf_names, manifest, params, outputs_present)
+    if store is not None:
+        for pdf_name in removed:
+            store.remove_name(manifest[pdf_name]["sha256"], pdf_name)
+    prune_outputs(output_path, manifest, removed)
+    print(f"{len(pending)} PDF(s) à extraire sur {len(pdf_names)}.")
+    scheduler = Scheduler(args.aging)
+    infos = {}
+    schedule_documents(scheduler, [name for name in pending if name not in interactive], args, infos, BULK)
+    schedule_documents(scheduler, [name for name in pending if name in interactive], args, infos, INTERACTIVE)
+
+    # Mode démon : les PDFs déposés dans data/ (ou data/interactive/) sont traités dès
+    # qu'ils sont complets. Les lots sont alors limités à --round-size documents pour
+    # qu'un PDF interactif n'attende jamais plus d'un lot
+    arrivals = Queue()
+    if args.watch:
+        os.makedirs(os.path.join(data_path, INTERACTIVE_DIR), exist_ok=True)
+        for path, priority in ((data_path, BULK), (os.path.join(data_path, INTERACTIVE_DIR), INTERACTIVE)):
+            threading.Thread(target=forward_arrivals, args=(path, priority, args.debounce, arrivals), daemon=True).start()
+        print(f"Surveillance de {data_path} (Ctrl+C pour arrêter)...")
+
+    try:
+        while True:
+            while scheduler:
+                batch = scheduler.next_round(args.round_size if args.watch else None)
+                process_documents(batch, args, manifest, params, store, ledger,
+                                  {name: infos.pop(name) for name in batch if name in infos})
+                save_manifest(output_path, manifest)
+                # Les arrivées sont examinées entre deux lots
+                while not arrivals.empty():
+                    schedule_arrivals(scheduler, arrivals.get(), args, manifest, params, outputs_present, infos)
+            if not args.watch:
+                break
+            schedule_arrivals(scheduler, arrivals.get(), args, manifest, params, outputs_present, infos)
+    except KeyboardInterrupt:
+        print("Arrêt de la surveillance.")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Client pour le service HTTP de GROBID.
+
+Le service est démarré une seule fois sur localhost (./gradlew run) puis reste actif
+entre deux exécutions : les modèles ne sont chargés qu'au premier démarrage et chaque
+nouveau PDF ne coûte plus que le temps de son traitement.
+
+Les PDFs sont envoyés en flux sur des connexions persistantes réutilisées : le corps
+multipart n'est jamais assemblé en mémoire, le contenu du fichier passe directement
+du disque à la socket (sendfile, ou projection mmap).
+"""
+
+import http.client
+import mmap
+import os
+import signal
+import ssl
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+# Adresse par défaut du service GROBID
+GROBID_URL = "http://localhost:8070"
+
+# Correspondance entre les commandes du mode batch et les routes du service
+SERVICE_ROUTES = {
+    "processFullText": "processFulltextDocument",
+    "processReferences": "processReferences",
+    "processHeader": "processHeaderDocument",
+}
+
+
+def is_grobid_alive(url=GROBID_URL, timeout=2):
+    try:
+        with urllib.request.urlopen(f"{url}/api/isalive", timeout=timeout) as response:
+            return response.status == 200 and response.read().strip() == b"true"
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def wait_for_grobid(url=GROBID_URL, timeout=180, interval=2, process=None):
+    # Avec `process` (service lancé par le script), l'attente s'arrête aussi si le
+    # processus se termine avant de répondre
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_grobid_alive(url):
+            return True
+        if process is not None and process.poll() is not None:
+            return False
+        time.sleep(interval)
+    return False
+
+
+def stop_process_group(process, grace=10):
+    # Arrête `./gradlew run` et la JVM du service qu'il a lancée (même groupe de
+    # processus, créé par start_new_session)
+    for sig, wait in ((signal.SIGTERM, grace), (signal.SIGKILL, None)):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            process.wait(wait)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def start_grobid_service(base_path, url=GROBID_URL, timeout=180):
+    # Le service tourne déjà : rien à faire
+    if is_grobid_alive(url):
+        print(f"Le service GROBID est déjà actif sur {url}.")
+        return True
+
+    print("Démarrage du service GROBID...")
+    log_path = os.path.join(base_path, "grobid-service.log")
+    with open(log_path, "ab") as log_file:
+        # Nouvelle session : le service survit à la fin du script et reste chaud
+        # pour les exécutions suivantes
+        process = subprocess.Popen(
+            ["./gradlew", "run"],
+            cwd=base_path,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+    if wait_for_grobid(url, timeout, process=process):
+        print(f"Service GROBID disponible sur {url}.")
+        return True
+
+    if process.poll() is not None:
+        print(f"Le service GROBID s'est arrêté au démarrage (code {process.returncode}, voir {log_path}).")
+        return False
+    # Un service encore en démarrage occuperait la mémoire laissée au mode batch
+    print(f"Le service GROBID n'a pas répondu après {timeout} secondes : arrêt du service (voir {log_path}).")
+    stop_process_group(process)
+    return False
+
+
+class ConnectionPool:
+    # Connexions HTTP persistantes (keep-alive) vers le service, réutilisées d'un
+    # document à l'autre et partagées entre les threads d'envoi
+    def __init__(self, url, max_idle=32):
+        parts = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout):
+        # Retourne (connexion, réutilisée ?)
+        with self.lock:
+            if self.idle:
+                connection = self.idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+        return self.connection_class(self.netloc, timeout=timeout), False
+
+    def release(self, connection):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(url):
+    with _pools_lock:
+        if url not in _pools:
+            _pools[url] = ConnectionPool(url)
+        return _pools[url]
+
+
+def multipart_envelope(fields, file_field, file_name):
+    # En-tête et fin du corps multipart : le contenu du fichier est envoyé entre les
+    # deux, sans être copié dans le corps
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    parts.append(
+        (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+            f'filename="{file_name}"\r\nContent-Type: application/pdf\r\n\r\n'
+        ).encode()
+    )
+    return b"".join(parts), f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def post_pdf(url, exe, pdf_name, content_length, send_content, timeout, fields):
+    # Envoie le PDF au service sur une connexion du pool ; `send_content(connexion)`
+    # écrit les `content_length` octets du PDF sur la connexion
+    route = SERVICE_ROUTES[exe]
+    head, tail, content_type = multipart_envelope(fields or {}, "input", pdf_name)
+    pool = connection_pool(url)
+    while True:
+        connection, reused = pool.acquire(timeout)
+        try:
+            connection.putrequest("POST", f"{pool.prefix}/api/{route}")
+            connection.putheader("Content-Type", content_type)
+            connection.putheader("Content-Length", str(len(head) + content_length + len(tail)))
+            connection.putheader("Accept", "application/xml")
+            connection.endheaders()
+            connection.send(head)
+            send_content(connection)
+            connection.send(tail)
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            connection.close()
+            # Connexion persistante fermée par le service entre deux documents :
+            # nouvel essai sur une connexion neuve
+            if reused:
+                continue
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            pool.release(connection)
+        if response.status != 200:
+            raise urllib.error.HTTPError(
+                f"{url}/api/{route}", response.status, response.reason, response.headers, None
+            )
+        return body.decode("utf-8")
+
+
+def send_file(connection, pdf_file, size):
+    # sendfile quand le système le permet (copie directe du fichier vers la socket),
+    # sinon projection en mémoire : le PDF n'est jamais lu dans un objet bytes
+    if size == 0:
+        return
+    if hasattr(os, "sendfile") and not isinstance(connection.sock, ssl.SSLSocket):
+        connection.sock.sendfile(pdf_file, 0, size)
+        return
+    with mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        connection.sock.sendall(memoryview(mapped))
+
+
+def process_pdf(pdf_path, exe="processFullText", url=GROBID_URL, timeout=300, fields=None):
+    with open(pdf_path, "rb") as pdf_file:
+        size = os.fstat(pdf_file.fileno()).st_size
+        return post_pdf(url, exe, os.path.basename(pdf_path), size,
+                        lambda connection: send_file(connection, pdf_file, size), timeout, fields)
+
+
+def process_pdf_data(pdf_data, pdf_name, exe="processFullText", url=GROBID_URL, timeout=300, fields=None):
+    pdf_data = memoryview(pdf_data)
+    return post_pdf(url, exe, pdf_name, pdf_data.nbytes, lambda connection: connection.sock.sendall(pdf_data),
+                    timeout, fields)
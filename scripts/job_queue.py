@@ -0,0 +1,200 @@
+"""
+File de travaux Redis pour répartir l'extraction sur plusieurs machines.
+
+Un coordinateur dépose les PDFs (contenu compris : les travailleurs n'ont pas
+besoin d'accéder à data/) et récupère les TEI ; des travailleurs, sur n'importe
+quelle machine ayant accès au serveur Redis, prennent les travaux un par un.
+Chaque travail pris est loué pour une durée limitée, prolongée tant que le
+travailleur est en vie : le travail d'un travailleur mort redevient disponible à
+l'expiration de sa location. Après `max_attempts` essais, le travail est rendu en
+échec au coordinateur. Un travailleur dont le backend est en panne rend le travail
+sans consommer d'essai ; l'erreur transmise au coordinateur indique si elle vient du
+backend, pour que le document ne soit pas mis en cause.
+
+Clés Redis (préfixe `name`) :
+- `pending` : liste des travaux en attente ;
+- `leases` : ensemble trié des travaux pris, par date d'expiration de la location ;
+- `payloads`, `names`, `attempts` : contenu du PDF, nom et nombre d'essais ;
+- `results`, `errors` : TEI (compressé) ou erreur (JSON) des travaux terminés ;
+- `done` : liste des travaux terminés, attendue par le coordinateur.
+"""
+
+import json
+import uuid
+import zlib
+
+import redis
+
+from resilience import BackendError
+
+# Prise d'un travail : retrait de la file et location jusqu'à maintenant + durée
+CLAIM_SCRIPT = """
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local job_id = redis.call('LPOP', KEYS[1])
+if not job_id then return false end
+redis.call('ZADD', KEYS[2], t + tonumber(ARGV[1]), job_id)
+return job_id
+"""
+
+# Remise en file des travaux dont la location a expiré (travailleur mort ou bloqué) ;
+# ARGV[2] est l'erreur rendue après le dernier essai
+REQUEUE_SCRIPT = """
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', t)
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], job_id)
+    local attempts = redis.call('HINCRBY', KEYS[3], job_id, 1)
+    if attempts >= tonumber(ARGV[1]) then
+        redis.call('HSET', KEYS[4], job_id, ARGV[2])
+        redis.call('HDEL', KEYS[5], job_id)
+        redis.call('RPUSH', KEYS[6], job_id)
+    else
+        redis.call('RPUSH', KEYS[2], job_id)
+    end
+end
+return #expired
+"""
+
+# Prolongation de la location, seulement si le travail est toujours loué
+EXTEND_SCRIPT = """
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+return redis.call('ZADD', KEYS[1], 'XX', 'CH', t + tonumber(ARGV[2]), ARGV[1])
+"""
+
+
+def encode_error(error, backend):
+    return json.dumps({"error": error, "backend": backend}, ensure_ascii=False)
+
+
+def decode_error(value):
+    # Exception correspondant à l'erreur enregistrée : BackendError si elle vient du
+    # backend
+    value = value.decode("utf-8")
+    try:
+        error = json.loads(value)
+    except ValueError:
+        return RuntimeError(value)
+    return (BackendError if error["backend"] else RuntimeError)(error["error"])
+
+
+# Erreur d'un travail dont la location a expiré à chaque essai : le travailleur est
+# mort ou bloqué, ce qui ne met pas le document en cause
+LEASE_EXPIRED_ERROR = encode_error("location expirée", backend=True)
+
+
+class JobQueue:
+    def __init__(self, client, name="grobid", visibility_timeout=600, max_attempts=3):
+        self.client = client
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.keys = {
+            key: f"{name}:{key}"
+            for key in ("pending", "leases", "payloads", "names", "attempts", "results", "errors", "done")
+        }
+        self.claim_script = client.register_script(CLAIM_SCRIPT)
+        self.requeue_script = client.register_script(REQUEUE_SCRIPT)
+        self.extend_script = client.register_script(EXTEND_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    # Côté coordinateur
+
+    def enqueue(self, name, data):
+        job_id = uuid.uuid4().hex
+        pipeline = self.client.pipeline()
+        pipeline.hset(self.keys["payloads"], job_id, data)
+        pipeline.hset(self.keys["names"], job_id, name)
+        pipeline.rpush(self.keys["pending"], job_id)
+        pipeline.execute()
+        return job_id
+
+    def wait_done(self, timeout=5):
+        # Identifiant du prochain travail terminé, ou None après `timeout` secondes
+        self.requeue_expired()
+        item = self.client.blpop(self.keys["done"], timeout=timeout)
+        return item[1].decode() if item else None
+
+    def pop_result(self, job_id):
+        # Retourne (TEI, exception) et efface le travail
+        pipeline = self.client.pipeline()
+        pipeline.hget(self.keys["results"], job_id)
+        pipeline.hget(self.keys["errors"], job_id)
+        for key in ("payloads", "names", "attempts", "results", "errors"):
+            pipeline.hdel(self.keys[key], job_id)
+        result, error = pipeline.execute()[:2]
+        tei = zlib.decompress(result).decode("utf-8") if result is not None else None
+        return tei, decode_error(error) if error is not None else None
+
+    def cancel(self, job_id):
+        # Un travail annulé est ignoré par le travailleur qui le prendrait
+        pipeline = self.client.pipeline()
+        pipeline.lrem(self.keys["pending"], 0, job_id)
+        pipeline.zrem(self.keys["leases"], job_id)
+        for key in ("payloads", "names", "attempts", "results", "errors"):
+            pipeline.hdel(self.keys[key], job_id)
+        pipeline.execute()
+
+    # Côté travailleur
+
+    def requeue_expired(self):
+        keys = [self.keys[key] for key in ("leases", "pending", "attempts", "errors", "payloads", "done")]
+        return self.requeue_script(keys=keys, args=[self.max_attempts, LEASE_EXPIRED_ERROR])
+
+    def claim(self):
+        # Retourne (identifiant, nom, contenu du PDF), ou None si la file est vide
+        self.requeue_expired()
+        while True:
+            job_id = self.claim_script(keys=[self.keys["pending"], self.keys["leases"]],
+                                       args=[self.visibility_timeout])
+            if job_id is None:
+                return None
+            job_id = job_id.decode()
+            pipeline = self.client.pipeline()
+            pipeline.hget(self.keys["names"], job_id)
+            pipeline.hget(self.keys["payloads"], job_id)
+            name, data = pipeline.execute()
+            if data is None:
+                # Travail annulé entre-temps
+                self.client.zrem(self.keys["leases"], job_id)
+                continue
+            return job_id, name.decode("utf-8"), data
+
+    def extend(self, job_id):
+        return bool(self.extend_script(keys=[self.keys["leases"]], args=[job_id, self.visibility_timeout]))
+
+    def complete(self, job_id, tei):
+        # Ignoré si la location a expiré entre-temps : le travail a été remis en file
+        if not self.client.zrem(self.keys["leases"], job_id):
+            return False
+        pipeline = self.client.pipeline()
+        pipeline.hset(self.keys["results"], job_id, zlib.compress(tei.encode("utf-8")))
+        pipeline.hdel(self.keys["payloads"], job_id)
+        pipeline.rpush(self.keys["done"], job_id)
+        pipeline.execute()
+        return True
+
+    def release(self, job_id):
+        # Remet le travail en file sans compter d'essai (backend du travailleur en panne)
+        if not self.client.zrem(self.keys["leases"], job_id):
+            return False
+        self.client.rpush(self.keys["pending"], job_id)
+        return True
+
+    def fail(self, job_id, error):
+        if not self.client.zrem(self.keys["leases"], job_id):
+            return False
+        attempts = self.client.hincrby(self.keys["attempts"], job_id, 1)
+        pipeline = self.client.pipeline()
+        if attempts >= self.max_attempts:
+            pipeline.hset(self.keys["errors"], job_id, encode_error(error, backend=False))
+            pipeline.hdel(self.keys["payloads"], job_id)
+            pipeline.rpush(self.keys["done"], job_id)
+        else:
+            pipeline.rpush(self.keys["pending"], job_id)
+        pipeline.execute()
+        return True
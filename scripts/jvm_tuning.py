@@ -0,0 +1,168 @@
+"""
+Dimensionnement des JVM du mode batch.
+
+Le nombre de JVM, leur mémoire (-Xmx) et leur nombre de threads GROBID (-n) sont
+déduits des cœurs et de la mémoire disponibles. Chaque exécution enregistre les
+journaux du ramasse-miettes (-Xlog:gc) : la pression mémoire et le temps de pause
+observés ajustent la mémoire allouée par thread pour l'exécution suivante.
+
+La mémoire d'extraction d'un document est estimée d'après son nombre de pages, avec
+un coût par page appris, par tranche de taille de document, sur l'occupation
+maximale du tas des exécutions précédentes. Ces estimations servent à ne confier à
+une JVM que les documents qui tiennent ensemble dans son tas.
+"""
+
+import json
+import math
+import os
+import re
+
+# Mémoire de départ d'un thread GROBID, et part fixe de chaque JVM (modèles, code)
+DEFAULT_HEAP_PER_THREAD_MB = 1024
+JVM_BASE_HEAP_MB = 512
+MIN_HEAP_MB = 1024
+MAX_THREADS_PER_JVM = 4
+
+# Mémoire d'extraction d'un document : part fixe et coût par page de départ, et
+# tranches de nombre de pages pour lesquelles le coût par page est appris
+DOCUMENT_BASE_MB = 64
+DEFAULT_MB_PER_PAGE = 16
+PAGE_BUCKETS = (20, 50, 100, 300)
+
+# Seuils d'ajustement à partir des journaux GC
+HIGH_PRESSURE = 0.75
+LOW_PRESSURE = 0.3
+HIGH_PAUSE_RATIO = 0.05
+LOW_PAUSE_RATIO = 0.01
+
+GC_PAUSE_PATTERN = re.compile(r"\[([\d.]+)s\].*Pause.*?(\d+)M->(\d+)M\((\d+)M\) ([\d.]+)ms")
+GC_UPTIME_PATTERN = re.compile(r"\[([\d.]+)s\]")
+
+
+def available_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    # Hors Linux : mémoire physique totale
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024 ** 2
+
+
+def load_profile(profile_path):
+    try:
+        with open(profile_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"heap_per_thread_mb": DEFAULT_HEAP_PER_THREAD_MB, "runs": []}
+
+
+def save_profile(profile_path, profile):
+    tmp_path = f"{profile_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=1)
+    os.replace(tmp_path, profile_path)
+
+
+def auto_size(pdf_count, heap_per_thread_mb, cores=None, memory_mb=None, memory_fraction=0.75):
+    # Retourne (nombre de JVM, mémoire par JVM en Mo, threads par JVM)
+    cores = cores or os.cpu_count() or 1
+    budget_mb = int((memory_mb or available_memory_mb()) * memory_fraction)
+
+    threads = min(MAX_THREADS_PER_JVM, cores, max(1, pdf_count))
+    heap_mb = max(MIN_HEAP_MB, JVM_BASE_HEAP_MB + threads * heap_per_thread_mb)
+    # Machine trop petite pour une JVM complète : moins de threads
+    while threads > 1 and heap_mb > budget_mb:
+        threads -= 1
+        heap_mb = max(MIN_HEAP_MB, JVM_BASE_HEAP_MB + threads * heap_per_thread_mb)
+
+    shards = max(1, min(cores // threads, budget_mb // heap_mb, math.ceil(pdf_count / threads)))
+    return shards, heap_mb, threads
+
+
+def gc_log_options(gc_log_path):
+    return [f"-Xlog:gc:file={gc_log_path}:uptime,level,tags"]
+
+
+def read_gc_log(gc_log_path, heap_mb):
+    # Pression : occupation maximale après GC rapportée à -Xmx ; ratio de pause :
+    # temps passé en pause rapporté à la durée de vie de la JVM
+    peak_after_mb = 0
+    pause_ms = 0.0
+    uptime_s = 0.0
+    try:
+        with open(gc_log_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = GC_PAUSE_PATTERN.search(line)
+                if match:
+                    peak_after_mb = max(peak_after_mb, int(match.group(3)))
+                    pause_ms += float(match.group(5))
+                uptime = GC_UPTIME_PATTERN.match(line)
+                if uptime:
+                    uptime_s = max(uptime_s, float(uptime.group(1)))
+    except FileNotFoundError:
+        return None
+    return {
+        "peak_mb": peak_after_mb,
+        "pressure": peak_after_mb / heap_mb if heap_mb else 0.0,
+        "pause_ms": pause_ms,
+        "uptime_s": uptime_s,
+    }
+
+
+def summarize_gc(stats):
+    stats = [s for s in stats if s is not None]
+    if not stats:
+        return None
+    uptime_s = sum(s["uptime_s"] for s in stats)
+    pause_ms = sum(s["pause_ms"] for s in stats)
+    return {
+        "pressure": max(s["pressure"] for s in stats),
+        "pause_ratio": pause_ms / 1000 / uptime_s if uptime_s else 0.0,
+    }
+
+
+def recommend_heap_per_thread(summary, heap_per_thread_mb):
+    if summary is None:
+        return heap_per_thread_mb
+    if summary["pressure"] > HIGH_PRESSURE or summary["pause_ratio"] > HIGH_PAUSE_RATIO:
+        return int(heap_per_thread_mb * 1.5)
+    if summary["pressure"] < LOW_PRESSURE and summary["pause_ratio"] < LOW_PAUSE_RATIO:
+        return max(256, int(heap_per_thread_mb * 0.75))
+    return heap_per_thread_mb
+
+
+def page_bucket(pages):
+    for limit in PAGE_BUCKETS:
+        if pages <= limit:
+            return f"<={limit}"
+    return f">{PAGE_BUCKETS[-1]}"
+
+
+def estimate_document_mb(pages, profile):
+    mb_per_page = profile.get("mb_per_page", {}).get(page_bucket(pages), DEFAULT_MB_PER_PAGE)
+    return DOCUMENT_BASE_MB + pages * mb_per_page
+
+
+def document_threads(estimates, heap_mb, threads):
+    # Nombre de threads d'une JVM tel que ses plus gros documents, traités en même
+    # temps, tiennent dans son tas (au moins un)
+    largest = sorted(estimates, reverse=True)
+    while threads > 1 and sum(largest[:threads]) > heap_mb - JVM_BASE_HEAP_MB:
+        threads -= 1
+    return threads
+
+
+def learn_document_memory(profile, pages, threads, peak_mb):
+    # Au pic d'occupation du tas, on suppose les `threads` plus gros documents de la
+    # JVM en cours de traitement : le coût par page observé est lissé avec l'ancien,
+    # pour la tranche du plus gros document
+    largest = sorted(pages, reverse=True)[:threads]
+    if not largest or not sum(largest) or not peak_mb:
+        return
+    observed = max(1.0, (peak_mb - JVM_BASE_HEAP_MB - DOCUMENT_BASE_MB * len(largest)) / sum(largest))
+    table = profile.setdefault("mb_per_page", {})
+    bucket = page_bucket(largest[0])
+    table[bucket] = round(0.7 * table.get(bucket, DEFAULT_MB_PER_PAGE) + 0.3 * observed, 2)
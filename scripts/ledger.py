@@ -0,0 +1,123 @@
+"""
+Journal SQLite de l'avancement de chaque document.
+
+Chaque PDF passe par les états pending (à extraire), extracting (envoyé à GROBID),
+extracted (TEI écrit), parsed (TEI des références écrit), validated (rapport de
+cohérence écrit), reported (résultat enregistré dans le manifeste) ou failed. Les
+changements d'état sont regroupés et écrits par lots dans une seule transaction :
+après un arrêt brutal, le journal peut être en retard de quelques documents mais
+n'annonce jamais une étape qui n'a pas eu lieu, et l'exécution suivante reprend
+chaque document à sa dernière étape enregistrée.
+
+La base est en mode WAL : `progress` peut être consulté depuis un autre terminal
+pendant une exécution (`--progress`).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LEDGER_NAME = ".ledger.sqlite"
+STATES = ("pending", "extracting", "extracted", "parsed", "validated", "reported", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT,
+    params TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_at ON transitions (state, at);
+"""
+
+
+class Ledger:
+    def __init__(self, output_path, batch_size=64, flush_interval=2.0):
+        os.makedirs(output_path, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(output_path, LEDGER_NAME), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Les étapes en aval appellent `update` depuis leurs propres threads
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, name, state, sha256=None, params=None, error=None):
+        with self.lock:
+            encoded = json.dumps(params, sort_keys=True) if params is not None else None
+            self.buffer.append((name, state, sha256, encoded, error, time.time()))
+            if len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        with self.connection:
+            for name, state, sha256, params, error, at in self.buffer:
+                self.connection.execute(
+                    """
+                    INSERT INTO jobs (name, sha256, params, state, attempts, error, updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET
+                        sha256 = COALESCE(excluded.sha256, sha256),
+                        params = COALESCE(excluded.params, params),
+                        state = excluded.state,
+                        attempts = attempts + excluded.attempts,
+                        error = excluded.error,
+                        updated = excluded.updated
+                    """,
+                    (name, sha256, params, state, int(state == "extracting"), error, at),
+                )
+                self.connection.execute("INSERT INTO transitions VALUES (?, ?, ?)", (name, state, at))
+        self.buffer = []
+
+    def resumable(self, names, hashes, params):
+        # État enregistré des documents de `names` dont le PDF et les paramètres
+        # d'extraction n'ont pas changé depuis
+        self.flush()
+        encoded = json.dumps(params, sort_keys=True)
+        states = {}
+        for name in names:
+            row = self.connection.execute("SELECT sha256, params, state FROM jobs WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] == hashes[name] and row[1] == encoded:
+                states[name] = row[2]
+        return states
+
+    def progress(self, window=60.0):
+        # Nombre de documents par état et débit (documents terminés par minute sur
+        # les `window` dernières secondes)
+        self.flush()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        finished = self.connection.execute(
+            "SELECT COUNT(*) FROM transitions WHERE state = 'reported' AND at >= ?", (time.time() - window,)
+        ).fetchone()[0]
+        return {"states": counts, "per_minute": finished * 60.0 / window}
@@ -0,0 +1,116 @@
+"""
+Extraction rapide des références sans GROBID, pour un premier tri.
+
+Le texte du PDF est lu avec PyPDF2 ; la section des références est repérée par son
+titre, découpée en entrées, et chaque entrée est analysée avec `regex` (DOI,
+identifiant arXiv, année). Les appels de citation du corps du texte (auteur-année
+et numériques) sont aussi relevés. Le résultat est bien moins fin que celui de
+GROBID mais s'obtient en une fraction de seconde par document.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import regex
+from PyPDF2 import PdfReader
+
+from chunking import BIBLIOGRAPHY_HEADING
+
+DOI_PATTERN = regex.compile(r"\b10\.\d{4,9}/[-._;()/:\p{L}\p{N}]+[\p{L}\p{N}/]")
+ARXIV_PATTERN = regex.compile(r"\barXiv:\s*(\d{4}\.\d{4,5}(?:v\d+)?|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})", regex.IGNORECASE)
+YEAR_PATTERN = regex.compile(r"\b(1[89]\d{2}|20\d{2})[a-z]?\b")
+NUMBERED_ENTRY = regex.compile(r"^\s*(?:\[\d{1,4}\]|\d{1,4}\.\s+\p{Lu})")
+
+# Appels de citation : (Dupont et al., 2019), Dupont and Durand (2018), [3], [4-6]
+AUTHOR_YEAR_CITATION = regex.compile(
+    r"\p{Lu}[\p{L}'\-]+(?:\s+et\s+al\.?|\s+(?:and|&)\s+\p{Lu}[\p{L}'\-]+)?,?\s+\(?(?:1[89]|20)\d{2}[a-z]?\)?"
+)
+NUMERIC_CITATION = regex.compile(r"\[\d{1,4}(?:\s*[,–\-]\s*\d{1,4})*\]")
+
+
+def split_references(lines):
+    # Bibliographie numérotée : une entrée commence par un numéro ([12], 12.).
+    # Sinon, par une majuscule après une ligne terminée par un point si l'entrée en
+    # cours contient déjà une année
+    lines = [line.strip() for line in lines if line.strip()]
+    numbered = bool(lines) and bool(NUMBERED_ENTRY.match(lines[0]))
+    entries = []
+    current = []
+    for line in lines:
+        starts_entry = NUMBERED_ENTRY.match(line) if numbered else (
+            current
+            and current[-1].endswith(".")
+            and regex.match(r"\p{Lu}", line)
+            and YEAR_PATTERN.search(" ".join(current))
+        )
+        if starts_entry and current:
+            entries.append(current)
+            current = []
+        current.append(line)
+    if current:
+        entries.append(current)
+
+    # Recollage des mots coupés en fin de ligne
+    return [regex.sub(r"(\p{L})- (\p{L})", r"\1\2", " ".join(entry)) for entry in entries]
+
+
+def analyze_reference(raw):
+    doi = DOI_PATTERN.search(raw)
+    arxiv = ARXIV_PATTERN.search(raw)
+    year = YEAR_PATTERN.search(raw)
+    return {
+        "raw": raw,
+        "doi": doi.group(0).rstrip(".,;") if doi else None,
+        "arxiv": arxiv.group(1) if arxiv else None,
+        "year": year.group(1) if year else None,
+    }
+
+
+def extract_light(pdf_path):
+    reader = PdfReader(pdf_path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    text = "\n".join(pages)
+
+    # Dernier titre « References » du document : début de la bibliographie
+    headings = list(BIBLIOGRAPHY_HEADING.finditer(text))
+    if headings:
+        body, references_text = text[: headings[-1].start()], text[headings[-1].end():]
+    else:
+        body, references_text = text, ""
+
+    references = [analyze_reference(raw) for raw in split_references(references_text.splitlines())]
+    return {
+        "document": os.path.basename(pdf_path),
+        "pages": len(pages),
+        "references": references,
+        "citations": {
+            "author_year": [" ".join(match.split()) for match in AUTHOR_YEAR_CITATION.findall(body)],
+            "numeric": NUMERIC_CITATION.findall(body),
+        },
+        "dois": sum(1 for reference in references if reference["doi"]),
+        "arxiv_ids": sum(1 for reference in references if reference["arxiv"]),
+    }
+
+
+def light_file_name(pdf_name):
+    return os.path.splitext(pdf_name)[0] + ".light.json"
+
+
+def write_light_result(pdf_path, output_path):
+    try:
+        result = extract_light(pdf_path)
+    except Exception as e:
+        # PyPDF2 lève des exceptions de types très variés sur les fichiers corrompus
+        return os.path.basename(pdf_path), None, repr(e)
+    with open(os.path.join(output_path, light_file_name(result["document"])), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=1, ensure_ascii=False)
+    return result["document"], result, None
+
+
+def run_light_extraction(pdf_paths, output_path, max_workers=None):
+    os.makedirs(output_path, exist_ok=True)
+    if not pdf_paths:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(write_light_result, pdf_paths, [output_path] * len(pdf_paths), chunksize=4))
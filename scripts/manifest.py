@@ -0,0 +1,101 @@
+"""
+Manifeste d'extraction du dossier de sortie.
+
+Pour chaque PDF de data/, le manifeste garde son empreinte SHA-256, les paramètres
+d'extraction (version de GROBID, commande, options) et les fichiers TEI produits.
+Seuls les PDFs nouveaux ou modifiés repartent vers GROBID, et les sorties des PDFs
+supprimés sont effacées.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def is_pdf(name):
+    # Les fichiers cachés (copies temporaires, ._ de macOS) sont ignorés
+    return name.lower().endswith(".pdf") and not name.startswith(".")
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_path):
+    try:
+        with open(os.path.join(output_path, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_path, manifest):
+    # Écriture atomique : un arrêt en cours d'écriture ne corrompt pas le manifeste
+    path = os.path.join(output_path, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def plan_extraction(data_path, output_path, pdf_names, manifest, params, outputs_present=None):
+    # Retourne les PDFs à extraire (nouveaux ou modifiés) et les entrées supprimées.
+    # `outputs_present(pdf_name, entry)` remplace la recherche des sorties dans
+    # output_path quand elles sont rangées ailleurs
+    if outputs_present is None:
+        def outputs_present(pdf_name, entry):
+            return all(os.path.exists(os.path.join(output_path, name)) for name in entry["outputs"])
+
+    pending = []
+    for pdf_name in pdf_names:
+        path = os.path.join(data_path, pdf_name)
+        entry = manifest.get(pdf_name)
+        try:
+            signature = file_signature(path)
+            if entry is not None and entry["params"] == params:
+                present = outputs_present(pdf_name, entry)
+                # Taille et date inchangées : pas besoin de recalculer l'empreinte
+                if present and entry["size"] == signature["size"] and entry["mtime"] == signature["mtime"]:
+                    continue
+                if present and entry["sha256"] == sha256_file(path):
+                    entry.update(signature)
+                    continue
+        except FileNotFoundError:
+            # PDF retiré depuis qu'il a été listé (mis en quarantaine, déplacé) : rien
+            # à extraire
+            continue
+        pending.append(pdf_name)
+
+    removed = sorted(set(manifest) - set(pdf_names))
+    return pending, removed
+
+
+def record_extraction(manifest, data_path, pdf_name, params, outputs, sha256=None):
+    path = os.path.join(data_path, pdf_name)
+    manifest[pdf_name] = {
+        "sha256": sha256 or sha256_file(path),
+        "params": params,
+        "outputs": outputs,
+        **file_signature(path),
+    }
+
+
+def prune_outputs(output_path, manifest, removed):
+    for pdf_name in removed:
+        for name in manifest.pop(pdf_name)["outputs"]:
+            try:
+                os.remove(os.path.join(output_path, name))
+                print(f"{name} supprimé ({pdf_name} n'est plus dans data/).")
+            except FileNotFoundError:
+                pass
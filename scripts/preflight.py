@@ -0,0 +1,89 @@
+"""
+Contrôle préalable des PDFs avant leur envoi à GROBID.
+
+Chaque PDF est ouvert avec PyPDF2 dans un pool de processus pour relever sa taille,
+son nombre de pages, son chiffrement et la présence d'une couche texte. Les fichiers
+illisibles, protégés par mot de passe ou scannés (sans texte) sont écartés avant
+d'occuper GROBID ; les très gros documents passent dans une file séparée, et chaque
+file est triée du plus court au plus long.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+# Au-delà de ces seuils, un document passe dans la file des gros documents
+LARGE_PAGE_COUNT = 100
+LARGE_FILE_SIZE = 50 * 1024 ** 2
+
+# Pages examinées pour détecter une couche texte
+TEXT_SAMPLE_PAGES = 5
+
+
+def inspect_pdf(path):
+    info = {
+        "name": os.path.basename(path),
+        "size": os.path.getsize(path),
+        "pages": None,
+        "encrypted": False,
+        "has_text": False,
+        "error": None,
+    }
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            info["encrypted"] = True
+            # Beaucoup de PDFs sont chiffrés sans mot de passe d'ouverture
+            if not reader.decrypt(""):
+                return info
+        info["pages"] = len(reader.pages)
+        info["has_text"] = any(
+            page.extract_text().strip() for page in reader.pages[:TEXT_SAMPLE_PAGES]
+        )
+    except Exception as e:
+        # PyPDF2 lève des exceptions de types très variés sur les fichiers corrompus
+        info["error"] = repr(e)
+    return info
+
+
+def rejection_reason(info):
+    if info["error"] is not None:
+        return f"PDF illisible : {info['error']}"
+    if info["pages"] is None:
+        return "PDF protégé par un mot de passe"
+    if info["pages"] == 0:
+        return "PDF sans page"
+    if not info["has_text"]:
+        return "PDF sans couche texte (document scanné ?)"
+    return None
+
+
+def is_large(info):
+    return info["pages"] > LARGE_PAGE_COUNT or info["size"] > LARGE_FILE_SIZE
+
+
+def route_documents(infos):
+    # Retourne les documents rejetés (avec la raison), puis les files normale et
+    # des gros documents, triées du plus court au plus long
+    rejected, regular, large = [], [], []
+    for info in infos:
+        reason = rejection_reason(info)
+        if reason is not None:
+            rejected.append((info, reason))
+        elif is_large(info):
+            large.append(info)
+        else:
+            regular.append(info)
+
+    def cost(info):
+        return (info["pages"], info["size"])
+
+    return rejected, sorted(regular, key=cost), sorted(large, key=cost)
+
+
+def preflight(pdf_paths, max_workers=None):
+    if not pdf_paths:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(inspect_pdf, pdf_paths, chunksize=4))
@@ -0,0 +1,173 @@
+"""
+Suivi en direct d'une commande GROBID en mode batch.
+
+Les sorties standard et d'erreur de la JVM sont lues ligne par ligne (rien n'est
+gardé en mémoire en dehors des dernières lignes d'erreur) et transformées en
+événements par document : début, fin et échec, avec leur durée. Les événements sont
+transmis à une fonction de rappel au fur et à mesure, ce qui permet de suivre le
+débit et de détecter un blocage pendant l'exécution. Un document qui dépasse son
+délai maximal arrête la JVM : les documents qu'elle n'a pas pu terminer sont
+signalés comme interrompus pour être relancés.
+"""
+
+import collections
+import queue
+import re
+import subprocess
+import threading
+import time
+
+ProgressEvent = collections.namedtuple("ProgressEvent", ["kind", "document", "timestamp", "elapsed", "detail"])
+
+FAILURE_PATTERN = re.compile(r"\b(ERROR|Exception|Error|failed)\b")
+
+
+def document_pattern(document):
+    # Nom de fichier complet : précédé d'un début de ligne, d'un séparateur de
+    # chemin, d'une espace ou d'une ponctuation, et suivi d'autre chose qu'un
+    # caractère de nom de fichier (« a.pdf » ne correspond pas à « data.pdf »)
+    return re.compile(r"(?<![^\s/\\'\"(\[:=])" + re.escape(document) + r"(?![\w.-])")
+
+
+def matching_documents(line, patterns):
+    # Documents cités dans `line`. Un nom qui n'apparaît qu'à l'intérieur du nom
+    # d'un autre document (« paper.pdf » dans « my paper.pdf ») n'est pas retenu
+    spans = {}
+    for document, pattern in patterns.items():
+        found = [match.span() for match in pattern.finditer(line)]
+        if found:
+            spans[document] = found
+
+    def inside_other(document, span):
+        return any(
+            other != document and start <= span[0] and span[1] <= end and end - start > span[1] - span[0]
+            for other, other_spans in spans.items() for start, end in other_spans
+        )
+
+    return [document for document, found in spans.items() if not all(inside_other(document, span) for span in found)]
+
+
+def print_event(event):
+    if event.kind == "start":
+        print(f"Début : {event.document}")
+    elif event.kind == "finish":
+        print(f"Fin : {event.document}" + (f" ({event.elapsed:.1f} s)" if event.elapsed is not None else ""))
+    elif event.kind == "failure":
+        print(f"Échec : {event.document} : {event.detail}")
+    elif event.kind == "interrupted":
+        print(f"Interrompu : {event.document}")
+    elif event.kind == "stall":
+        print(f"Aucune progression depuis {event.elapsed:.0f} s ({event.detail}).")
+
+
+def read_lines(stream, name, lines):
+    for line in stream:
+        lines.put((name, line.rstrip("\n")))
+    lines.put((name, None))
+
+
+def stream_command(command, documents, output_size, on_event=print_event, stall_timeout=None, poll_interval=1.0,
+                   document_timeout=None):
+    # `documents` : noms des PDFs traités par la commande ; `output_size(document)`
+    # donne la taille de la sortie du document, ou None si elle n'existe pas encore.
+    # Retourne le code de sortie et les dernières lignes de la sortie d'erreur
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace", bufsize=1
+    )
+    lines = queue.Queue()
+    for stream, name in ((process.stdout, "stdout"), (process.stderr, "stderr")):
+        threading.Thread(target=read_lines, args=(stream, name, lines), daemon=True).start()
+
+    started = {}
+    pending = set(documents)
+    patterns = {document: document_pattern(document) for document in documents}
+    # Taille de chaque sortie au contrôle précédent
+    sizes = {}
+    stderr_tail = collections.deque(maxlen=50)
+    last_event = last_check = last_stall = time.monotonic()
+    killed = False
+
+    def emit(kind, document, detail=None, elapsed=None):
+        # `elapsed` : durée du document, ou celle fournie pour les événements sans
+        # document (inactivité pour "stall")
+        nonlocal last_event
+        now = time.monotonic()
+        if document in started:
+            elapsed = now - started[document]
+        if kind != "stall":
+            last_event = now
+        on_event(ProgressEvent(kind, document, time.time(), elapsed, detail))
+
+    def check_finished(exited=False):
+        # GROBID n'écrit pas ses sorties de façon atomique : un document n'est terminé
+        # que lorsque la taille de sa sortie n'a pas changé depuis le contrôle
+        # précédent, ou que la JVM s'est terminée normalement
+        nonlocal last_check, killed
+        last_check = time.monotonic()
+        for document in sorted(pending):
+            size = output_size(document)
+            if size is None:
+                continue
+            if exited or (size > 0 and sizes.get(document) == size):
+                pending.discard(document)
+                emit("finish", document)
+            else:
+                sizes[document] = size
+        # Un document bloqué ne coûte que son délai : la JVM est arrêtée
+        if document_timeout and not killed:
+            for document in sorted(pending & set(started)):
+                if last_check - started[document] > document_timeout:
+                    pending.discard(document)
+                    emit("failure", document, f"délai de {document_timeout} secondes dépassé")
+                    killed = True
+            if killed:
+                process.kill()
+
+    # Quelle que soit l'erreur (y compris dans `on_event`), la JVM ne doit pas
+    # survivre au suivi
+    try:
+        open_streams = 2
+        while open_streams:
+            try:
+                name, line = lines.get(timeout=poll_interval)
+            except queue.Empty:
+                check_finished()
+                # Signalé au plus une fois par `stall_timeout`, avec la durée totale
+                # d'inactivité
+                idle = time.monotonic() - last_event
+                if stall_timeout and idle > stall_timeout and pending and time.monotonic() - last_stall > stall_timeout:
+                    last_stall = time.monotonic()
+                    emit("stall", None, f"{len(pending)} document(s) en attente", idle)
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+            if name == "stderr":
+                stderr_tail.append(line)
+
+            for document in matching_documents(line, {d: patterns[d] for d in pending}):
+                if FAILURE_PATTERN.search(line):
+                    pending.discard(document)
+                    emit("failure", document, line.strip())
+                elif document not in started:
+                    started[document] = time.monotonic()
+                    emit("start", document)
+            # Vérification des sorties au plus une fois par intervalle
+            if time.monotonic() - last_check >= poll_interval:
+                check_finished()
+
+        returncode = process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    # Après un arrêt forcé, une sortie peut être incomplète : seules les sorties
+    # stables sont retenues
+    check_finished(exited=not killed)
+    for document in sorted(pending):
+        # Un document jamais commencé par une JVM arrêtée ou en erreur n'est pas en cause
+        if killed or (returncode != 0 and document not in started):
+            emit("interrupted", document)
+        else:
+            emit("failure", document, "aucune sortie produite")
+    return returncode, list(stderr_tail)
@@ -0,0 +1,27 @@
+"""
+Mise en quarantaine des PDFs qui ne peuvent pas être extraits.
+
+Le PDF est déplacé hors de data/ (il ne sera plus proposé à GROBID) et une fiche
+JSON à côté de lui indique la raison et la date de la mise en quarantaine.
+"""
+
+import json
+import os
+import shutil
+import time
+
+QUARANTINE_PATH = "quarantine"
+
+
+def quarantine_pdf(data_path, quarantine_path, pdf_name, reason, details=None):
+    os.makedirs(quarantine_path, exist_ok=True)
+    shutil.move(os.path.join(data_path, pdf_name), os.path.join(quarantine_path, pdf_name))
+    record = {
+        "document": pdf_name,
+        "reason": reason,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **(details or {}),
+    }
+    with open(os.path.join(quarantine_path, f"{pdf_name}.json"), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=1, ensure_ascii=False)
+    print(f"{pdf_name} mis en quarantaine : {reason}")
@@ -0,0 +1,66 @@
+"""
+Reprises après échec et disjoncteur.
+
+Un document en échec est retenté quelques fois avec un délai croissant. Si la
+proportion d'échecs sur les derniers documents devient trop forte, c'est en général
+le backend lui-même qui est en panne : le disjoncteur s'ouvre et l'exécution
+s'arrête au lieu de mettre tout le corpus en quarantaine. Les erreurs propres au
+backend (service injoignable ou saturé) comptent pour le disjoncteur mais ne mettent
+jamais le document en cause.
+"""
+
+import collections
+import random
+import threading
+import urllib.error
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class BackendError(RuntimeError):
+    # Échec attribué au backend, rapporté sans l'exception d'origine (par exemple
+    # par un travailleur de la file Redis)
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, window=20, max_failure_rate=0.5, min_calls=10):
+        self.results = collections.deque(maxlen=window)
+        self.max_failure_rate = max_failure_rate
+        self.min_calls = min_calls
+        self.is_open = False
+        self.lock = threading.Lock()
+
+    def record(self, success):
+        with self.lock:
+            self.results.append(success)
+            failures = self.results.count(False)
+            if len(self.results) >= self.min_calls and failures / len(self.results) >= self.max_failure_rate:
+                # Une fois ouvert, le disjoncteur le reste jusqu'à la fin de l'exécution
+                self.is_open = True
+
+    @property
+    def open(self):
+        return self.is_open
+
+
+# Codes HTTP d'un service saturé ou indisponible, quel que soit le document
+BACKEND_HTTP_CODES = {502, 503, 504}
+
+
+def is_backend_error(error):
+    # Vrai si l'échec vient du backend (connexion refusée ou coupée, service saturé,
+    # disjoncteur ouvert) et non du document lui-même
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in BACKEND_HTTP_CODES
+    if isinstance(error, urllib.error.URLError):
+        error = error.reason
+    return isinstance(error, (ConnectionError, CircuitOpenError, BackendError))
+
+
+def backoff_delay(attempt, base=2.0, maximum=60.0):
+    # Délai exponentiel avec une part aléatoire, pour ne pas relancer tous les
+    # documents en échec au même instant
+    return min(maximum, base * 2 ** attempt) * random.uniform(0.5, 1.0)
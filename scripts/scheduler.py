@@ -0,0 +1,70 @@
+"""
+Ordonnancement des documents entre demandes interactives et traitements de masse.
+
+Deux classes de priorité : les documents interactifs (un article à vérifier tout de
+suite) passent avant tout le reste, dans leur ordre d'arrivée ; les documents de
+masse sont pris du moins coûteux au plus coûteux. Le coût est estimé d'après le
+nombre de pages et la taille du fichier, et diminue avec l'attente : un gros
+document finit toujours par passer devant les petits arrivés après lui.
+"""
+
+import collections
+import time
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Taille moyenne d'une page, pour estimer le nombre de pages sans ouvrir le PDF
+AVERAGE_PAGE_SIZE = 100 * 1024
+
+
+def estimate_pages(info):
+    return info.get("pages") or max(1, round(info["size"] / AVERAGE_PAGE_SIZE))
+
+
+def estimate_cost(info):
+    # Coût en « pages » : le nombre de pages domine, la taille départage les
+    # documents riches en figures
+    return estimate_pages(info) + info["size"] / 1024 ** 2
+
+
+Job = collections.namedtuple("Job", ["name", "cost", "priority", "added"])
+
+
+class Scheduler:
+    def __init__(self, aging=0.1, clock=time.monotonic):
+        # `aging` : coût retranché par seconde d'attente
+        self.aging = aging
+        self.clock = clock
+        self.jobs = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __contains__(self, name):
+        return name in self.jobs
+
+    def add(self, name, cost, priority=BULK):
+        job = self.jobs.get(name)
+        if job is not None and job.priority == INTERACTIVE:
+            # Un document déjà demandé en interactif le reste
+            priority = INTERACTIVE
+        self.jobs[name] = Job(name, cost, priority, job.added if job is not None else self.clock())
+
+    def effective_cost(self, job, now):
+        return job.cost - self.aging * (now - job.added)
+
+    def next_round(self, size=None):
+        # Prochain lot de documents : tous les interactifs en attente s'il y en a
+        # (lot court, traité sans attendre les autres), sinon au plus `size`
+        # documents de masse dans l'ordre des coûts effectifs
+        interactive = sorted((job for job in self.jobs.values() if job.priority == INTERACTIVE),
+                             key=lambda job: job.added)
+        if interactive:
+            selected = interactive
+        else:
+            now = self.clock()
+            selected = sorted(self.jobs.values(), key=lambda job: self.effective_cost(job, now))[:size]
+        for job in selected:
+            del self.jobs[job.name]
+        return [job.name for job in selected]
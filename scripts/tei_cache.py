@@ -0,0 +1,118 @@
+"""
+Cache TEI global, adressé par le contenu des PDFs.
+
+Une entrée est identifiée par l'empreinte SHA-256 du PDF et les paramètres
+d'extraction : le même PDF déposé deux fois sous des noms différents, dans n'importe
+quel projet de la machine, n'est extrait qu'une fois. Le cache a un budget en octets
+et évince les entrées les moins récemment utilisées (date de modification mise à jour
+à chaque lecture). Les écritures sont atomiques et protégées par un verrou `filelock`
+pour que plusieurs exécutions puissent partager le même cache.
+
+La taille totale du cache est tenue à jour dans `.size` à chaque écriture : le cache
+n'est parcouru que lorsqu'elle dépasse le budget, et l'éviction descend alors sous
+90 % du budget pour que les écritures suivantes n'aient pas à le reparcourir.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from filelock import FileLock
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "grobid-tei")
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+SIZE_FILE = ".size"
+# Taille visée après une éviction, en part du budget
+EVICTION_TARGET = 0.9
+
+
+def cache_key(pdf_sha256, params):
+    encoded = json.dumps(params, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(pdf_sha256.encode("ascii") + b"\0" + encoded).hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.tei.xml")
+
+
+def cache_get(cache_dir, key):
+    path = cache_path(cache_dir, key)
+    try:
+        with open(path, encoding="utf-8") as f:
+            tei = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        # Marque l'entrée comme récemment utilisée
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return tei
+
+
+def read_total(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, SIZE_FILE), encoding="utf-8") as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_total(cache_dir, total):
+    with open(os.path.join(cache_dir, SIZE_FILE), "w", encoding="utf-8") as f:
+        f.write(str(total))
+
+
+def cache_put(cache_dir, key, tei, max_bytes=DEFAULT_CACHE_SIZE):
+    path = cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with FileLock(os.path.join(cache_dir, ".lock")):
+        try:
+            previous_size = os.path.getsize(path)
+        except FileNotFoundError:
+            previous_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(tei)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        total = read_total(cache_dir)
+        if total is None or total + size - previous_size > max_bytes:
+            # Total inconnu (cache créé par une version précédente) ou budget dépassé
+            total = evict(cache_dir, max_bytes)
+        else:
+            total += size - previous_size
+        write_total(cache_dir, total)
+
+
+def evict(cache_dir, max_bytes):
+    # À appeler avec le verrou : recalcule la taille du cache et, si elle dépasse le
+    # budget, supprime les entrées les plus anciennes jusqu'à repasser sous
+    # EVICTION_TARGET du budget. Retourne la nouvelle taille totale
+    entries = []
+    total = 0
+    for subdir in os.scandir(cache_dir):
+        if not subdir.is_dir():
+            continue
+        for entry in os.scandir(subdir.path):
+            if entry.name.endswith(".tei.xml"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+    if total <= max_bytes:
+        return total
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * EVICTION_TARGET:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
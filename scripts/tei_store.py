@@ -0,0 +1,136 @@
+"""
+Stockage des sorties dans une base LMDB plutôt qu'en fichiers séparés.
+
+Avec des centaines de milliers de PDFs, output/ contient trois fichiers par document
+aux noms parfois très longs : beaucoup d'inodes et des listages lents. La base garde,
+pour chaque document identifié par l'empreinte SHA-256 du PDF, ses sorties
+compressées (TEI complet, TEI des références, rapport de cohérence) et une fiche de
+métadonnées (noms du PDF, paramètres d'extraction, tailles). Une sortie est désignée
+par son suffixe (`.tei.xml`, `.references.tei.xml`, ...) : l'export recompose les
+noms de fichiers d'output/ à partir du nom du PDF.
+
+Les lectures se font dans une transaction LMDB : `view` rend directement la zone de
+la base projetée en mémoire, sans copie, tant que la transaction est ouverte.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import time
+import zlib
+
+import lmdb
+
+DEFAULT_MAP_SIZE = 64 * 1024 ** 3
+
+
+def output_suffix(pdf_name, output_name):
+    # Partie du nom de la sortie qui suit le nom du PDF sans extension
+    stem = os.path.splitext(pdf_name)[0]
+    return output_name[len(stem):]
+
+
+class TeiStore:
+    def __init__(self, path, map_size=DEFAULT_MAP_SIZE, readonly=False):
+        # map_size n'est qu'une réservation d'espace d'adressage : le fichier ne
+        # grandit qu'au fil des écritures
+        self.env = lmdb.open(path, map_size=map_size, max_dbs=2, readonly=readonly, subdir=True)
+        self.files = self.env.open_db(b"files")
+        self.meta = self.env.open_db(b"meta")
+
+    def close(self):
+        self.env.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def file_key(key, suffix):
+        return f"{key}\0{suffix}".encode("utf-8")
+
+    def put(self, key, pdf_name, outputs, params):
+        # `outputs` : nom de la sortie -> contenu (str). Le document est enregistré en
+        # une seule transaction : une lecture ne voit jamais un document incomplet
+        with self.env.begin(write=True) as txn:
+            raw = txn.get(key.encode("ascii"), db=self.meta)
+            metadata = json.loads(raw) if raw is not None else {"names": []}
+            if metadata.get("params") != params:
+                # Sorties produites avec d'autres paramètres : remplacées entièrement
+                for suffix in metadata.get("files", {}):
+                    txn.delete(self.file_key(key, suffix), db=self.files)
+                metadata["files"] = {}
+            for output_name, content in outputs.items():
+                suffix = output_suffix(pdf_name, output_name)
+                data = content.encode("utf-8")
+                txn.put(self.file_key(key, suffix), zlib.compress(data), db=self.files)
+                metadata["files"][suffix] = len(data)
+            if pdf_name not in metadata["names"]:
+                metadata["names"].append(pdf_name)
+            metadata["params"] = params
+            metadata["stored"] = time.time()
+            txn.put(key.encode("ascii"), json.dumps(metadata, ensure_ascii=False).encode("utf-8"), db=self.meta)
+
+    def metadata(self, key):
+        with self.env.begin() as txn:
+            raw = txn.get(key.encode("ascii"), db=self.meta)
+        return json.loads(raw) if raw is not None else None
+
+    def contains(self, key, params=None):
+        metadata = self.metadata(key)
+        return metadata is not None and (params is None or metadata["params"] == params)
+
+    def keys(self):
+        with self.env.begin() as txn:
+            return [key.decode("ascii") for key in txn.cursor(db=self.meta).iternext(values=False)]
+
+    @contextlib.contextmanager
+    def view(self, key, suffix):
+        # Contenu compressé de la sortie, sans copie : le memoryview n'est valide que
+        # dans le bloc `with`
+        with self.env.begin(buffers=True) as txn:
+            yield txn.get(self.file_key(key, suffix), db=self.files)
+
+    def get(self, key, suffix):
+        with self.view(key, suffix) as buffer:
+            if buffer is None:
+                return None
+            return zlib.decompress(buffer).decode("utf-8")
+
+    def remove_name(self, key, pdf_name):
+        # Le document n'est supprimé qu'une fois qu'aucun PDF ne le référence plus
+        with self.env.begin(write=True) as txn:
+            raw = txn.get(key.encode("ascii"), db=self.meta)
+            if raw is None:
+                return
+            metadata = json.loads(raw)
+            if pdf_name in metadata["names"]:
+                metadata["names"].remove(pdf_name)
+            if metadata["names"]:
+                txn.put(key.encode("ascii"), json.dumps(metadata, ensure_ascii=False).encode("utf-8"), db=self.meta)
+                return
+            for suffix in metadata["files"]:
+                txn.delete(self.file_key(key, suffix), db=self.files)
+            txn.delete(key.encode("ascii"), db=self.meta)
+
+    def export(self, output_path):
+        # Réécrit la disposition habituelle d'output/ (un fichier par sortie et par
+        # PDF) ; retourne le nombre de fichiers écrits
+        os.makedirs(output_path, exist_ok=True)
+        written = 0
+        for key in self.keys():
+            metadata = self.metadata(key)
+            for suffix in metadata["files"]:
+                with self.view(key, suffix) as buffer:
+                    data = zlib.decompress(buffer)
+                for pdf_name in metadata["names"]:
+                    path = os.path.join(output_path, os.path.splitext(pdf_name)[0] + suffix)
+                    fd, tmp_path = tempfile.mkstemp(dir=output_path, suffix=".tmp")
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                    written += 1
+        return written
@@ -0,0 +1,155 @@
+"""
+Outils de manipulation des fichiers TEI produits par GROBID.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+TEI_NS = "http://www.tei-c.org/ns/1.0"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+NS = {"tei": TEI_NS}
+
+ET.register_namespace("", TEI_NS)
+ET.register_namespace("xlink", "http://www.w3.org/1999/xlink")
+
+
+def tei(tag):
+    return f"{{{TEI_NS}}}{tag}"
+
+
+def parse_tei(source):
+    # Texte, octets ou flux binaire (lu au fil de l'eau par le parseur)
+    if isinstance(source, str):
+        return ET.fromstring(source.encode("utf-8"))
+    if isinstance(source, bytes):
+        return ET.fromstring(source)
+    return ET.parse(source).getroot()
+
+
+def derive_references_tei(fulltext_tei):
+    # Le TEI complet contient déjà la bibliographie (back/div/listBibl) : on en
+    # extrait un TEI de la même forme que celui de processReferences, sans
+    # relancer le modèle de références
+    root = parse_tei(fulltext_tei)
+
+    references = ET.Element(tei("TEI"))
+    header = ET.SubElement(references, tei("teiHeader"))
+    ET.SubElement(header, tei("fileDesc"))
+    text = ET.SubElement(references, tei("text"))
+    ET.SubElement(text, tei("front"))
+    ET.SubElement(text, tei("body"))
+    back = ET.SubElement(text, tei("back"))
+    list_bibl = ET.SubElement(back, tei("listBibl"))
+
+    for bibl_struct in root.iterfind(".//tei:text/tei:back//tei:listBibl/tei:biblStruct", NS):
+        list_bibl.append(bibl_struct)
+
+    return ET.tostring(references, encoding="unicode", xml_declaration=True)
+
+
+# Identifiants numérotés par GROBID (b0, fig_0, tab_0, foot_0, formula_0...)
+NUMBERED_ID_PATTERN = re.compile(r"^([A-Za-z]\w*?)(\d+)$")
+POINTER_ATTRIBUTES = ("target", "corresp", "ref")
+YEAR_PATTERN = re.compile(r"\b(1[89]\d{2}|20\d{2})[a-z]?\b")
+
+
+def renumber_ids(root, counters, suffix):
+    # Les identifiants numérotés continuent la numérotation des morceaux
+    # précédents ; les autres reçoivent un suffixe propre au morceau
+    xml_id = f"{{{XML_NS}}}id"
+    mapping = {}
+    for element in root.iter():
+        old_id = element.get(xml_id)
+        if old_id is None:
+            continue
+        match = NUMBERED_ID_PATTERN.match(old_id)
+        if match:
+            prefix = match.group(1)
+            new_id = f"{prefix}{counters.get(prefix, 0)}"
+            counters[prefix] = counters.get(prefix, 0) + 1
+        else:
+            new_id = f"{old_id}{suffix}"
+        mapping[old_id] = new_id
+        element.set(xml_id, new_id)
+
+    for element in root.iter():
+        for attribute in POINTER_ATTRIBUTES:
+            value = element.get(attribute)
+            if value and value.startswith("#"):
+                element.set(attribute, " ".join(
+                    f"#{mapping.get(token.lstrip('#'), token.lstrip('#'))}" for token in value.split()
+                ))
+
+
+def first_author_key(bibl_struct):
+    surname = bibl_struct.find(".//tei:author/tei:persName/tei:surname", NS)
+    date = bibl_struct.find(".//tei:imprint/tei:date", NS)
+    if surname is None or not surname.text or date is None:
+        return None
+    year = YEAR_PATTERN.search(date.get("when") or date.text or "")
+    return (surname.text.strip().lower(), year.group(1)) if year else None
+
+
+def link_citations(root):
+    # Les citations d'un morceau sans bibliographie n'ont pas de cible : on les
+    # relie à l'entrée dont le premier auteur et l'année apparaissent dans la citation
+    xml_id = f"{{{XML_NS}}}id"
+    keys = {}
+    for bibl_struct in root.iterfind(".//tei:text/tei:back//tei:listBibl/tei:biblStruct", NS):
+        key = first_author_key(bibl_struct)
+        if key is not None:
+            keys.setdefault(key, []).append(bibl_struct.get(xml_id))
+
+    for ref in root.iterfind(".//tei:text/tei:body//tei:ref[@type='bibr']", NS):
+        if ref.get("target"):
+            continue
+        text = "".join(ref.itertext()).lower()
+        years = set(YEAR_PATTERN.findall(text))
+        candidates = [
+            bibl_ids[0] for (surname, year), bibl_ids in keys.items()
+            if year in years and surname in text and len(bibl_ids) == 1
+        ]
+        if len(candidates) == 1:
+            ref.set("target", f"#{candidates[0]}")
+
+
+def stitch_tei(chunk_teis):
+    # Assemble les TEI des morceaux d'un même PDF : en-tête et front du premier
+    # morceau, corps et annexes mis bout à bout, bibliographies fusionnées
+    counters = {}
+    chunks = []
+    for index, chunk_tei in enumerate(chunk_teis):
+        root = ET.fromstring(chunk_tei.encode("utf-8") if isinstance(chunk_tei, str) else chunk_tei)
+        renumber_ids(root, counters, f"_c{index}" if index else "")
+        chunks.append(root)
+
+    stitched = chunks[0]
+    text = stitched.find("tei:text", NS)
+    body = text.find("tei:body", NS)
+    if body is None:
+        body = ET.SubElement(text, tei("body"))
+    back = text.find("tei:back", NS)
+    if back is None:
+        back = ET.SubElement(text, tei("back"))
+
+    list_bibl = back.find(".//tei:listBibl", NS)
+    if list_bibl is None:
+        list_bibl = ET.SubElement(ET.SubElement(back, tei("div"), {"type": "references"}), tei("listBibl"))
+
+    for chunk in chunks[1:]:
+        chunk_text = chunk.find("tei:text", NS)
+        chunk_body = chunk_text.find("tei:body", NS)
+        if chunk_body is not None:
+            body.extend(list(chunk_body))
+        chunk_back = chunk_text.find("tei:back", NS)
+        if chunk_back is None:
+            continue
+        for div in list(chunk_back):
+            chunk_list_bibl = div.find(".//tei:listBibl", NS)
+            if chunk_list_bibl is not None:
+                list_bibl.extend(chunk_list_bibl.findall("tei:biblStruct", NS))
+            else:
+                back.append(div)
+
+    link_citations(stitched)
+    return ET.tostring(stitched, encoding="unicode", xml_declaration=True)
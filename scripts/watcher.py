@@ -0,0 +1,114 @@
+"""
+Surveillance d'un dossier pour traiter les PDFs dès leur arrivée.
+
+Sous Linux, le dossier est surveillé avec inotify (par ctypes) : seuls les
+événements de fin d'écriture et de déplacement sont lus, sans jamais reparcourir le
+dossier. Ailleurs, le dossier est parcouru à intervalle régulier. Dans les deux cas,
+un fichier n'est rendu qu'après un délai sans nouvelle écriture et une taille stable,
+pour ne pas traiter un PDF en cours de copie.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from manifest import is_pdf
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def open_inotify(path):
+    # Retourne un descripteur inotify sur `path`, ou None si inotify est indisponible
+    library = ctypes.util.find_library("c")
+    if library is None:
+        return None
+    libc = ctypes.CDLL(library, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def read_inotify_names(fd):
+    names = []
+    try:
+        buffer = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset < len(buffer):
+        _, _, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+        offset += EVENT_HEADER.size
+        name = buffer[offset:offset + length].rstrip(b"\0")
+        offset += length
+        if name:
+            names.append(os.fsdecode(name))
+    return names
+
+
+def scan_signatures(path):
+    signatures = {}
+    for entry in os.scandir(path):
+        if entry.is_file() and is_pdf(entry.name):
+            stat = entry.stat()
+            signatures[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return signatures
+
+
+def watch_pdfs(path, debounce=1.0, poll_interval=1.0):
+    # Générateur infini : rend d'abord tous les PDFs présents une fois la surveillance
+    # en place (rien n'est perdu entre un premier traitement et le démarrage de la
+    # surveillance), puis des listes de PDFs nouvellement arrivés et complets
+    fd = open_inotify(path)
+    known = scan_signatures(path)
+    # Nom -> (dernier changement, taille observée)
+    pending = {}
+    try:
+        yield sorted(known)
+        while True:
+            if fd is not None:
+                readable, _, _ = select.select([fd], [], [], poll_interval)
+                changed = read_inotify_names(fd) if readable else []
+            else:
+                time.sleep(poll_interval)
+                signatures = scan_signatures(path)
+                changed = [name for name, signature in signatures.items() if known.get(name) != signature]
+                known = signatures
+
+            now = time.monotonic()
+            for name in changed:
+                if is_pdf(name):
+                    pending[name] = (now, None)
+
+            ready = []
+            for name, (changed_at, size) in list(pending.items()):
+                if now - changed_at < debounce:
+                    continue
+                try:
+                    current_size = os.path.getsize(os.path.join(path, name))
+                except FileNotFoundError:
+                    del pending[name]
+                    continue
+                if current_size == size:
+                    ready.append(name)
+                    del pending[name]
+                else:
+                    # Taille encore en mouvement : nouvelle période d'attente
+                    pending[name] = (now, current_size)
+            if ready:
+                yield sorted(ready)
+    finally:
+        if fd is not None:
+            os.close(fd)